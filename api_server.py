@@ -3,33 +3,78 @@ Enhanced Flask API Server for Economic Dashboard Frontend
 Provides RESTful API endpoints for all economic data
 """
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Blueprint, Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
+import os
 import sys
 sys.path.append('.')
 from backend.data_processor import EconomicDataProcessor
 from backend.country_comparison import CountryComparison
+from backend.tracing import instrument_flask, tracer
+from backend.slow_log import SlowRequestLog
+from backend.dataset_store import pin_per_request
+from backend.jobs import JobQueue
+from backend.prewarm import prewarm_comparisons
 from datetime import datetime, timedelta
 import pandas as pd
 
-app = Flask(__name__, static_folder='frontend', static_url_path='')
-CORS(app)
+api = Blueprint('api', __name__)
 
-# Initialize data processor and country comparison
-processor = EconomicDataProcessor()
-comparator = CountryComparison()
+# Data processor and country comparison, shared by every app in the process
+processor = None
+comparator = None
 
-@app.route('/')
+# Long-running operations (exports, refreshes) run here instead of in request threads;
+# their status is saved under data/.jobs so a poll reaching any worker finds them
+jobs = JobQueue(state_dir=os.environ.get('JOB_STATE_DIR', os.path.join('data', '.jobs')))
+
+def load_shared_state():
+    """Load datasets once per process.
+
+    Under a preloading server this runs in the master, so forked workers share
+    the loaded frames copy-on-write instead of each re-reading the CSVs.
+    """
+    global processor, comparator
+    if processor is None:
+        processor = EconomicDataProcessor()
+    if comparator is None:
+        comparator = CountryComparison()
+        if os.environ.get('PREWARM_ON_START', '0') == '1':
+            # In the master under preload, so every worker starts with warm caches
+            report = prewarm_comparisons(comparator, timeout=float(os.environ.get('PREWARM_TIMEOUT', 120)))
+            print(f"Prewarmed comparison caches in {report['seconds']:.1f}s"
+                  + (f" ({len(report['failed'])} failed)" if report['failed'] else ''))
+    return processor, comparator
+
+def create_app() -> Flask:
+    """Application factory used by the dev server, Gunicorn and Waitress"""
+    load_shared_state()
+    
+    app = Flask(__name__, static_folder='frontend', static_url_path='')
+    CORS(app)
+    instrument_flask(app)
+    slow_log = SlowRequestLog.from_env()
+    if slow_log:
+        slow_log.install(app)
+    # Each request reads one consistent version even if a reload publishes mid-request
+    pin_per_request(app, processor.store)
+    if os.environ.get('WORLD_BANK_REFRESH', 'on').lower() != 'off':
+        # Started on the first request so each forked worker runs its own scheduler
+        app.before_request(comparator.refresher.ensure_started)
+    app.register_blueprint(api)
+    return app
+
+@api.route('/')
 def index():
     """Serve the main landing page"""
     return send_from_directory('frontend', 'index.html')
 
-@app.route('/dashboard')
+@api.route('/dashboard')
 def dashboard():
     """Serve the dashboard page"""
     return send_from_directory('frontend', 'dashboard.html')
 
-@app.route('/api/indicators')
+@api.route('/api/indicators')
 def get_indicators():
     """Get list of all available indicators"""
     indicators = [
@@ -124,7 +169,7 @@ def get_indicators():
     ]
     return jsonify(indicators)
 
-@app.route('/api/data/<indicator>')
+@api.route('/api/data/<indicator>')
 def get_indicator_data(indicator):
     """Get data for a specific indicator"""
     
@@ -156,18 +201,27 @@ def get_indicator_data(indicator):
     df = processor.get_dataset(dataset_map[indicator])
     
     # Apply filters
-    if start_date:
-        df = df[df['Date'] >= pd.to_datetime(start_date)]
-    if end_date:
-        df = df[df['Date'] <= pd.to_datetime(end_date)]
-    
-    if indicator == 'cpi' and region:
-        df = df[df['Region'] == region]
-    
-    if indicator == 'unemployment' and state:
-        df = df[df['State'] == state]
+    with tracer.span('filter.date', rows_in=len(df)) as span:
+        if start_date:
+            df = df[df['Date'] >= pd.to_datetime(start_date)]
+        if end_date:
+            df = df[df['Date'] <= pd.to_datetime(end_date)]
+        
+        if indicator == 'cpi' and region:
+            df = df[df['Region'] == region]
+        
+        if indicator == 'unemployment' and state:
+            df = df[df['State'] == state]
+        span.set('rows', len(df))
     
     # Prepare response
+    with tracer.span('transform.rows', rows=len(df)):
+        data = _rows_to_items(indicator, df)
+    
+    return jsonify(data)
+
+def _rows_to_items(indicator, df):
+    """Convert dataset rows into JSON-ready dicts for an indicator"""
     data = []
     for _, row in df.iterrows():
         item = {
@@ -210,9 +264,9 @@ def get_indicator_data(indicator):
         
         data.append(item)
     
-    return jsonify(data)
+    return data
 
-@app.route('/api/statistics/<indicator>')
+@api.route('/api/statistics/<indicator>')
 def get_statistics(indicator):
     """Get statistical summary for an indicator"""
     
@@ -240,7 +294,7 @@ def get_statistics(indicator):
     
     return jsonify(stats)
 
-@app.route('/api/correlation')
+@api.route('/api/correlation')
 def get_correlation():
     """Get correlation matrix"""
     try:
@@ -256,7 +310,7 @@ def get_correlation():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/summary')
+@api.route('/api/summary')
 def get_summary():
     """Get summary of all indicators"""
     summary = []
@@ -289,12 +343,26 @@ def get_summary():
     
     return jsonify(summary)
 
-@app.route('/api/health')
+@api.route('/api/health')
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
         'datasets': len(processor.datasets),
+        'stores': {
+            'datasets': processor.store.stats(),
+            'comparison': comparator.store.stats(),
+        },
+        'comparison_cache': comparator.cache.stats(),
+        'refresh': comparator.refresher.stats(),
+        'worldbank': comparator.client.stats(),
+        'jobs': jobs.stats(),
+        'coalescing': {
+            'correlation': processor._correlation_flight.stats(),
+            'comparison': comparator._comparison_flight.stats(),
+            'worldbank_fetch': dict(comparator._fetch_flight.stats(),
+                                    fetched_by_peers=comparator.fetched_by_peers),
+        },
         'timestamp': datetime.now().isoformat()
     })
 
@@ -302,21 +370,30 @@ def health_check():
 # COUNTRY COMPARISON ENDPOINTS
 # ============================================
 
-@app.route('/api/comparison/countries')
+@api.route('/api/comparison/countries')
 def get_available_countries():
-    """Get list of available countries for comparison"""
+    """Get list of available countries for comparison (?scope=featured|economies|aggregates|all)"""
+    scope = request.args.get('scope', 'featured')
+    try:
+        codes = comparator.universe(scope)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     countries = [
         {
             'code': code,
             'name': info['name'],
             'flag': info['flag'],
-            'color': info['color']
+            'color': info['color'],
+            'region': info['region'],
+            'income_group': info['income_group'],
+            'aggregate': info['aggregate']
         }
-        for code, info in comparator.COMPARISON_COUNTRIES.items()
+        for code, info in ((code, comparator.COUNTRIES[code]) for code in codes)
     ]
     return jsonify(countries)
 
-@app.route('/api/comparison/<indicator>')
+@api.route('/api/comparison/<indicator>')
 def get_country_comparison(indicator):
     """Get comparison data for a specific indicator"""
     
@@ -324,36 +401,53 @@ def get_country_comparison(indicator):
     countries = request.args.get('countries', 'IND,CHN,USA,GBR,JPN,DEU').split(',')
     start_year = int(request.args.get('start_year', 2010))
     end_year = int(request.args.get('end_year', 2024))
+    # e.g. fields=years,values to skip stats and rankings
+    fields = request.args.get('fields', None)
+    if fields:
+        fields = fields.split(',')
     
     try:
         data = comparator.get_comparison_data(
             indicator, 
             countries, 
             start_year, 
-            end_year
+            end_year,
+            fields
         )
         return jsonify(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/comparison/relative/<indicator>')
+@api.route('/api/comparison/relative/<indicator>')
 def get_relative_comparison(indicator):
-    """Get relative comparison with India as baseline (100)"""
+    """Get relative comparison (ratio, difference or log difference) to a base country or year"""
     
     base_country = request.args.get('base', 'IND')
     compare_countries = request.args.get('countries', 'CHN,USA,GBR,JPN,DEU,BRA').split(',')
+    mode = request.args.get('mode', 'ratio')
+    base_year = request.args.get('base_year', None, type=int)
+    start_year = int(request.args.get('start_year', 2010))
+    end_year = int(request.args.get('end_year', 2024))
     
     try:
         data = comparator.get_relative_comparison(
             indicator, 
             base_country, 
-            compare_countries
+            compare_countries,
+            mode,
+            base_year,
+            start_year,
+            end_year
         )
         return jsonify(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/comparison/multi-indicator')
+@api.route('/api/comparison/multi-indicator')
 def get_multi_indicator_comparison():
     """Get multi-indicator comparison for radar chart"""
     
@@ -365,42 +459,162 @@ def get_multi_indicator_comparison():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/comparison/rankings/<indicator>')
+@api.route('/api/comparison/rankings/<indicator>')
 def get_country_rankings(indicator):
-    """Get country rankings for a specific indicator"""
+    """Get country rankings for a specific indicator and year (default: latest)"""
     
     countries = request.args.get('countries', None)
     if countries:
         countries = countries.split(',')
+    year = request.args.get('year', None, type=int)
     
     try:
-        data = comparator.get_comparison_data(indicator, countries)
-        
-        # Return just the rankings
-        return jsonify({
-            'indicator': indicator,
-            'rankings': data['rankings'],
-            'india_position': data['india_position']
-        })
+        return jsonify(comparator.get_rankings(indicator, countries, year))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/comparison/export')
-def export_comparison_data():
-    """Export all comparison data"""
+@api.route('/api/comparison/rankings/<indicator>/history')
+def get_rank_history(indicator):
+    """Get one country's rank in every year"""
+    
+    country = request.args.get('country', 'IND')
+    countries = request.args.get('countries', None)
+    if countries:
+        countries = countries.split(',')
+    
     try:
-        comparator.export_all_comparisons()
-        return jsonify({
-            'status': 'success',
-            'message': 'Comparison data exported successfully'
-        })
+        return jsonify(comparator.get_rank_history(indicator, country, countries))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/api/comparison/top/<indicator>')
+def get_top_countries(indicator):
+    """Get the top (or ?order=asc bottom) N countries of a scope for one year"""
+    
+    n = max(1, min(request.args.get('n', 10, type=int), len(comparator.COUNTRIES)))
+    year = request.args.get('year', None, type=int)
+    scope = request.args.get('scope', 'economies')
+    ascending = request.args.get('order', 'desc') == 'asc'
+    country = request.args.get('country', 'IND')
+    
+    try:
+        return jsonify(comparator.get_top_countries(indicator, n, year, scope, ascending, country))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/comparison/percentiles/<indicator>')
+def get_percentiles(indicator):
+    """Get percentile cutoffs across a scope for one year, and one country's standing"""
+    
+    year = request.args.get('year', None, type=int)
+    scope = request.args.get('scope', 'economies')
+    country = request.args.get('country', 'IND')
+    
+    try:
+        percentiles = [float(q) for q in request.args.get('q', '10,25,50,75,90').split(',')]
+        if not all(0 <= q <= 100 for q in percentiles):
+            raise ValueError("Percentiles must be between 0 and 100")
+        return jsonify(comparator.get_percentiles(indicator, percentiles, year, scope, country))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _peer_groups_arg():
+    groups = request.args.get('groups', None)
+    return groups.split(',') if groups else None
+
+@api.route('/api/comparison/peers')
+def get_peer_groups():
+    """Get the peer groups and their members"""
+    return jsonify([
+        {'name': name, 'members': members, 'count': len(members)}
+        for name, members in comparator.PEER_GROUPS.items()
+    ])
+
+@api.route('/api/comparison/peers/dashboard')
+def get_peer_dashboard():
+    """Get one country's latest standing in each peer group for every indicator"""
+    
+    country = request.args.get('country', 'IND')
+    
+    try:
+        return jsonify(comparator.get_peer_dashboard(country, _peer_groups_arg()))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/comparison/peers/<indicator>')
+def get_peer_position(indicator):
+    """Get one country's percentile, z-score and rank within peer groups (?history=true for every year)"""
+    
+    country = request.args.get('country', 'IND')
+    year = request.args.get('year', None, type=int)
+    history = request.args.get('history', 'false').lower() == 'true'
+    
+    try:
+        return jsonify(comparator.get_peer_position(indicator, country, _peer_groups_arg(),
+                                                    year, history))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _export_job(force: bool, progress=None) -> dict:
+    report = comparator.export_all_comparisons(force, progress=progress)
+    return {'indicators': report['indicators'], 'seconds': report['seconds']}
+
+def _job_accepted(job):
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job.id,
+        'job': job.to_dict(),
+        'url': f'/api/jobs/{job.id}'
+    }), 202
+
+@api.route('/api/comparison/export', methods=['GET', 'POST'])
+def export_comparison_data():
+    """Export all comparison data in the background; poll the returned job"""
+    force = request.args.get('force', 'false').lower() == 'true'
+    # Forced or not, one export at a time: the lock file spans this process's queue and
+    # every other worker's
+    job = jobs.submit(('export', force), _export_job, force, name='comparison.export',
+                      lock=os.path.join(comparator.data_dir, '.export.lock'))
+    if job.status == 'skipped':
+        return jsonify({
+            'status': 'already running',
+            'job_id': job.id,
+            'job': job.to_dict(),
+            'message': f'An export is {job.message}'
+        }), 409
+    return _job_accepted(job)
+
+@api.route('/api/comparison/refresh', methods=['POST'])
+def refresh_comparison_data():
+    """Re-fetch World Bank data for every comparison indicator in the background"""
+    countries = request.args.get('countries', None)
+    countries = sorted(countries.upper().split(',')) if countries else None
+    job = jobs.submit(('refresh', tuple(countries or ())), comparator.refresh_all, countries,
+                      name='comparison.refresh')
+    return _job_accepted(job)
+
+@api.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Status, progress and result of a background job"""
+    job = jobs.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 if __name__ == '__main__':
+    app = create_app()
     print("🚀 Starting Economic Dashboard API Server...")
     print("📊 Loaded datasets:", len(processor.datasets))
     print("🌍 Country comparison enabled with", len(comparator.COMPARISON_COUNTRIES), "countries")
     print("🌐 Server running at: http://localhost:5000")
     print("📱 Frontend available at: http://localhost:5000")
+    print("💡 For multi-worker serving use: python serve.py")
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -7,8 +7,16 @@ from datetime import datetime, timedelta
 import re
 import os
 
+from backend.tracing import instrument_flask, tracer
+from backend.slow_log import SlowRequestLog
+from backend.dataset_store import DatasetStore, pin_per_request
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
+instrument_flask(app)
+slow_log = SlowRequestLog.from_env()
+if slow_log:
+    slow_log.install(app)
 
 # -----------------------------
 # Data loading utilities (CSV)
@@ -219,8 +227,14 @@ def load_all_datasets():
         'cli': load_cli(),
     }
 
-# Load datasets at startup
-DATASETS = load_all_datasets()
+# Load datasets at startup; handlers read DATASETS through their pinned snapshot
+DATASET_STORE = DatasetStore(load_all_datasets())
+DATASETS = DATASET_STORE.view()
+pin_per_request(app, DATASET_STORE)
+
+def reload_datasets():
+    """Re-read every CSV and publish it as a new snapshot"""
+    return DATASET_STORE.publish(load_all_datasets())
 
 # Metadata for indicators
 INDICATOR_META = {
@@ -269,22 +283,26 @@ def get_indicator_data(indicator):
     if not meta or indicator not in DATASETS:
         return jsonify({'error': 'Indicator not found'}), 404
 
-    df = DATASETS[indicator]
+    with tracer.span('dataset.lookup', dataset=indicator) as span:
+        df = DATASETS[indicator]
+        span.set('rows', len(df))
 
     # Apply optional filters based on indicator
     filters = meta.get('filters', {})
-    if 'region' in filters:
-        region = request.args.get('region')
-        if region and region.lower() != 'all' and 'Region' in df.columns:
-            df = df[df['Region'].str.lower() == region.lower()]
-    if 'state' in filters:
-        state = request.args.get('state')
-        if state and state.lower() != 'all' and 'State' in df.columns:
-            df = df[df['State'].str.lower() == state.lower()]
-    if 'payment_mode' in filters:
-        mode = request.args.get('payment_mode')
-        if mode and mode.lower() != 'all' and 'Payment_Mode' in df.columns:
-            df = df[df['Payment_Mode'].str.lower() == mode.lower()]
+    with tracer.span('filter.params', rows_in=len(df)) as span:
+        if 'region' in filters:
+            region = request.args.get('region')
+            if region and region.lower() != 'all' and 'Region' in df.columns:
+                df = df[df['Region'].str.lower() == region.lower()]
+        if 'state' in filters:
+            state = request.args.get('state')
+            if state and state.lower() != 'all' and 'State' in df.columns:
+                df = df[df['State'].str.lower() == state.lower()]
+        if 'payment_mode' in filters:
+            mode = request.args.get('payment_mode')
+            if mode and mode.lower() != 'all' and 'Payment_Mode' in df.columns:
+                df = df[df['Payment_Mode'].str.lower() == mode.lower()]
+        span.set('rows', len(df))
     # For digital metric selection
     value_col = meta['value_col']
     if indicator == 'digital':
@@ -293,23 +311,28 @@ def get_indicator_data(indicator):
             value_col = metric
 
     # Apply range
-    df_range = _apply_range(df, 'date', range_param)
-    # Drop NA values of the selected value column
-    series_df = df_range[[ 'date', value_col ]].dropna().copy()
+    with tracer.span('filter.date', range=range_param, rows_in=len(df)) as span:
+        df_range = _apply_range(df, 'date', range_param)
+        # Drop NA values of the selected value column
+        series_df = df_range[[ 'date', value_col ]].dropna().copy()
+        span.set('rows', len(series_df))
     # If multiple rows per date (e.g., CPI Urban/Rural, unemployment states), aggregate by mean
     if not series_df.empty and series_df.duplicated(subset=['date']).any():
-        series_df = (
-            series_df.groupby('date', as_index=False)[value_col]
-            .mean()
-            .sort_values('date')
-        )
+        with tracer.span('aggregate.groupby', rows_in=len(series_df)) as span:
+            series_df = (
+                series_df.groupby('date', as_index=False)[value_col]
+                .mean()
+                .sort_values('date')
+            )
+            span.set('rows', len(series_df))
 
     # Labels and values
     is_quarter = bool(meta.get('is_quarter'))
     labels = [ _format_label(d, is_quarter=is_quarter) for d in series_df['date'] ]
     values = series_df[value_col].astype(float).tolist()
 
-    stats = _compute_stats(values)
+    with tracer.span('statistics', rows=len(values)):
+        stats = _compute_stats(values)
 
     # Allow dynamic unit override (e.g., digital metric Value_Cr)
     unit = meta['unit']
@@ -383,19 +406,26 @@ def correlation():
         return jsonify({'error': 'No valid indicators provided'}), 400
     # Build merged frame on date
     merged = None
-    for k in keys:
-        meta = INDICATOR_META[k]
-        df = DATASETS[k][['date', meta['value_col']]].rename(columns={meta['value_col']: meta['name']}).copy()
-        if merged is None:
-            merged = df
-        else:
-            merged = pd.merge(merged, df, on='date', how='inner')
+    with tracer.span('aggregate.merge', datasets=len(keys)) as span:
+        for k in keys:
+            meta = INDICATOR_META[k]
+            df = DATASETS[k][['date', meta['value_col']]].rename(columns={meta['value_col']: meta['name']}).copy()
+            if merged is None:
+                merged = df
+            else:
+                merged = pd.merge(merged, df, on='date', how='inner')
+        span.set('rows', 0 if merged is None else len(merged))
     if merged is None or merged.empty:
         return jsonify({'correlation': {}, 'dates': []})
-    corr = merged.drop(columns=['date']).corr(numeric_only=True)
+    with tracer.span('statistics.correlation', rows=len(merged)):
+        corr = merged.drop(columns=['date']).corr(numeric_only=True)
     corr_dict = corr.round(3).to_dict()
     return jsonify({'correlation': corr_dict, 'columns': list(corr.columns)})
 
+def create_app():
+    """Factory for production servers; datasets are already loaded at import"""
+    return app
+
 # Serve the main pages
 @app.route('/')
 def index():
@@ -0,0 +1,214 @@
+"""
+Country Cache Compaction for IndianPulse
+Find overlapping per-combination cache files and fold them into canonical entries
+
+    python -m backend.cache_compaction            # dry run: report only
+    python -m backend.cache_compaction --apply    # merge into the store, delete subsumed files
+
+A file is subsumed when another file for the same indicator holds every one of
+its (country, year) rows with the same value, e.g. the 3-country GDP file
+inside the 10-country one. All rows are merged into the comparison store's
+per-(indicator, country) entries; only files proven redundant are deleted.
+"""
+
+import os
+from itertools import combinations
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.comparison_store import COLUMNS, ComparisonStore
+
+
+class CacheFile:
+    """One `<indicator>_<countries...>_<start>_<end>.csv` file and its rows"""
+
+    def __init__(self, path: str, indicator: str, countries: List[str],
+                 start_year: int, end_year: int):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.indicator = indicator
+        self.countries = countries
+        self.start_year = start_year
+        self.end_year = end_year
+        self.size = os.path.getsize(path)
+        self.mtime = os.path.getmtime(path)
+        self._frame: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def parse(cls, path: str) -> Optional['CacheFile']:
+        parts = os.path.basename(path)[:-len('.csv')].split('_')
+        if len(parts) < 4 or not (parts[-1].isdigit() and parts[-2].isdigit()):
+            return None
+        return cls(path, parts[0], parts[1:-2], int(parts[-2]), int(parts[-1]))
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            df = pd.read_csv(self.path)
+            if not set(COLUMNS[:4]).issubset(df.columns):
+                raise ValueError(f"unexpected columns {list(df.columns)}")
+            self._frame = df.drop_duplicates(['country_code', 'year'], keep='last')
+            self._rows = self._frame.set_index(['country_code', 'year'])['value'].sort_index()
+        return self._frame
+
+    @property
+    def rows(self) -> pd.Series:
+        """Values indexed by (country_code, year)"""
+        self.frame
+        return self._rows
+
+    def could_contain(self, other: 'CacheFile') -> bool:
+        """Whether the file name alone allows `other` to be a subset of this file"""
+        return (self is not other and self.indicator == other.indicator
+                and set(other.countries) <= set(self.countries)
+                and self.start_year <= other.start_year and other.end_year <= self.end_year)
+
+
+def scan(cache_dir: str) -> Dict[str, List[CacheFile]]:
+    """Combination files grouped by indicator"""
+    by_indicator: Dict[str, List[CacheFile]] = {}
+    for filename in sorted(os.listdir(cache_dir)):
+        if not filename.endswith('.csv'):
+            continue
+        cache_file = CacheFile.parse(os.path.join(cache_dir, filename))
+        if cache_file is not None:
+            by_indicator.setdefault(cache_file.indicator, []).append(cache_file)
+    return by_indicator
+
+
+def contains(outer: CacheFile, inner: CacheFile, tolerance: float) -> bool:
+    """Every row of `inner` is in `outer` with a matching value"""
+    shared = inner.rows.index.isin(outer.rows.index)
+    if not shared.all():
+        return False
+    theirs = outer.rows.reindex(inner.rows.index).to_numpy(dtype=float)
+    return bool(np.allclose(inner.rows.to_numpy(dtype=float), theirs, rtol=0, atol=tolerance,
+                            equal_nan=True))
+
+
+def find_conflicts(files: List[CacheFile], tolerance: float) -> pd.DataFrame:
+    """(country, year) pairs whose value differs between files"""
+    stacked = pd.concat([f.rows.rename(f.name) for f in files], axis=1)
+    spread = stacked.max(axis=1) - stacked.min(axis=1)
+    conflicts = stacked[spread > tolerance]
+    return conflicts.reset_index()
+
+
+def predicted_hit_rates(by_indicator: Dict[str, List[CacheFile]],
+                        covered: Dict[str, set]) -> Dict[str, float]:
+    """Share of (indicator, country set) requests served from cache, before and after
+
+    The request mix is every country set seen in any file name, asked for every
+    indicator. Per-combination files only hit on the exact set; canonical
+    entries hit whenever every country in the set is stored.
+    """
+    combos = {tuple(sorted(f.countries)) for files in by_indicator.values() for f in files}
+    if not combos:
+        return {'before': 0.0, 'after': 0.0}
+    before = after = 0
+    for indicator, files in by_indicator.items():
+        exact = {tuple(sorted(f.countries)) for f in files}
+        before += sum(combo in exact for combo in combos)
+        after += sum(set(combo) <= covered.get(indicator, set()) for combo in combos)
+    total = len(combos) * len(by_indicator)
+    return {'before': round(before / total, 4), 'after': round(after / total, 4)}
+
+
+def compact(cache_dir: str, store: ComparisonStore, apply: bool = False,
+            tolerance: float = 1e-9) -> Dict:
+    """Detect subsumed files, check consistency and (with `apply`) merge and delete"""
+    by_indicator = scan(cache_dir)
+    report = {'files': 0, 'bytes': 0, 'subsumed': [], 'unreadable': [], 'conflicts': {},
+              'reclaimable_bytes': 0, 'applied': apply, 'indicators': {}}
+    covered: Dict[str, set] = {}
+
+    for indicator, files in sorted(by_indicator.items()):
+        readable = []
+        for cache_file in files:
+            try:
+                cache_file.frame
+                readable.append(cache_file)
+            except (ValueError, pd.errors.EmptyDataError, pd.errors.ParserError) as e:
+                report['unreadable'].append(f"{cache_file.name}: {e}")
+        report['files'] += len(files)
+        report['bytes'] += sum(f.size for f in files)
+        if not readable:
+            continue
+
+        # Largest files first, so each subset is attributed to its biggest superset
+        readable.sort(key=lambda f: (len(f.countries), f.end_year - f.start_year), reverse=True)
+        subsumed = {}
+        for outer, inner in combinations(readable, 2):
+            if inner.name in subsumed or outer.name in subsumed:
+                continue
+            if outer.could_contain(inner) and contains(outer, inner, tolerance):
+                subsumed[inner.name] = outer.name
+
+        conflicts = find_conflicts(readable, tolerance)
+        if not conflicts.empty:
+            report['conflicts'][indicator] = conflicts
+
+        # Canonical rows: newest file wins where files disagree
+        combined = pd.concat([f.frame.assign(_mtime=f.mtime) for f in readable], ignore_index=True)
+        merged = (combined.sort_values('_mtime', kind='stable')
+                  .drop_duplicates(['country_code', 'year'], keep='last'))
+        covered[indicator] = set(merged['country_code'])
+
+        reclaimable = sum(f.size for f in readable if f.name in subsumed)
+        report['reclaimable_bytes'] += reclaimable
+        report['subsumed'].extend((f.name, subsumed[f.name]) for f in readable if f.name in subsumed)
+        report['indicators'][indicator] = {
+            'files': len(files),
+            'subsumed': len(subsumed),
+            'countries': len(covered[indicator]),
+            'rows': len(merged),
+            'conflicts': len(conflicts),
+        }
+
+        if apply:
+            store.upsert(indicator, merged[COLUMNS], fetched_at=merged['_mtime'].min())
+            for f in readable:
+                if f.name in subsumed:
+                    os.remove(f.path)
+
+    report['hit_rate'] = predicted_hit_rates(by_indicator, covered)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compact the per-combination country cache")
+    parser.add_argument('--cache-dir', default=os.path.join('data', 'country_cache'))
+    parser.add_argument('--store', default=os.path.join('data', 'comparison_store'))
+    parser.add_argument('--apply', action='store_true',
+                        help='merge into the store and delete subsumed files (default: dry run)')
+    parser.add_argument('--tolerance', type=float, default=1e-9,
+                        help='largest difference treated as the same value')
+    parser.add_argument('--verbose', action='store_true', help='list every subsumed file')
+    args = parser.parse_args()
+
+    report = compact(args.cache_dir, ComparisonStore(args.store), args.apply, args.tolerance)
+
+    print(f"Scanned {report['files']} files ({report['bytes'] / 1024:.1f} KB) in {args.cache_dir}")
+    for indicator, info in report['indicators'].items():
+        print(f"  {indicator:<22} {info['files']:>3} files, {info['subsumed']:>3} subsumed -> "
+              f"{info['countries']:>3} countries, {info['rows']:>5} rows"
+              + (f", {info['conflicts']} conflicting values" if info['conflicts'] else ''))
+    if args.verbose:
+        for small, big in report['subsumed']:
+            print(f"  {small} is contained in {big}")
+    for problem in report['unreadable']:
+        print(f"  Skipped {problem}")
+    for indicator, conflicts in report['conflicts'].items():
+        print(f"\nConflicting values for {indicator} (newest file wins):")
+        print(conflicts.head(10).to_string(index=False))
+
+    verb = 'Reclaimed' if report['applied'] else 'Would reclaim'
+    print(f"\n{verb} {report['reclaimable_bytes'] / 1024:.1f} KB from {len(report['subsumed'])} subsumed files")
+    print(f"Predicted cache hit rate: {report['hit_rate']['before']:.0%} per combination -> "
+          f"{report['hit_rate']['after']:.0%} with per-country entries")
+    if not report['applied']:
+        print("Dry run; pass --apply to merge into the store and delete subsumed files")
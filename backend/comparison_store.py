@@ -0,0 +1,273 @@
+"""
+Comparison Store for IndianPulse
+Compressed columnar store for World Bank comparison data, partitioned by indicator
+
+Each indicator is one `.npz` partition. Every country's years and values are
+separate compressed members, so a read only decompresses the requested
+countries, and years are stored sorted so a year range is a binary search.
+Each country also records when it was last fetched, for expiry.
+
+Partitions are replaced atomically, so readers in any process see either the
+old or the new file, and writers hold a per-indicator file lock so concurrent
+read-modify-write cycles from several workers don't lose each other's rows.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.file_lock import FileLock, LockStats
+from backend.tracing import tracer
+
+COLUMNS = ['country_code', 'country', 'year', 'value', 'indicator']
+
+
+class ComparisonStore:
+    """Indexed, compressed columnar store keyed by (indicator, country, year)"""
+
+    def __init__(self, root: str = os.path.join('data', 'comparison_store')):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self.lock_stats = LockStats()
+        # indicator -> (signature, {country: fetched_at})
+        self._fetched_at: Dict[str, tuple] = {}
+
+    def partition_path(self, indicator: str) -> str:
+        return os.path.join(self.root, f"{indicator}.npz")
+
+    def lock(self, indicator: str, purpose: str = 'write',
+             timeout: Optional[float] = None) -> FileLock:
+        """Cross-process lock for one indicator; separate purposes don't block each other"""
+        return FileLock(os.path.join(self.root, f".{indicator}.{purpose}.lock"), timeout,
+                        stats=self.lock_stats)
+
+    def indicators(self) -> List[str]:
+        return sorted(f[:-len('.npz')] for f in os.listdir(self.root) if f.endswith('.npz'))
+
+    def signature(self, indicator: str) -> Optional[tuple]:
+        """Changes whenever the partition is rewritten"""
+        try:
+            stat = os.stat(self.partition_path(indicator))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _index(self, npz) -> Dict[str, str]:
+        return dict(zip(npz['countries'].tolist(), npz['names'].tolist()))
+
+    def countries(self, indicator: str) -> List[str]:
+        """Countries held for an indicator"""
+        path = self.partition_path(indicator)
+        if not os.path.exists(path):
+            return []
+        with np.load(path) as npz:
+            return npz['countries'].tolist()
+
+    def fetched_at(self, indicator: str) -> Dict[str, float]:
+        """Unix time each country was last fetched (0 when unknown)"""
+        signature = self.signature(indicator)
+        cached = self._fetched_at.get(indicator)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        times = {}
+        if signature is not None:
+            with np.load(self.partition_path(indicator)) as npz:
+                for code in npz['countries'].tolist():
+                    member = f'fetched_at__{code}'
+                    times[code] = float(npz[member]) if member in npz.files else 0.0
+        self._fetched_at[indicator] = (signature, times)
+        return times
+
+    def read(self, indicator: str, countries: Optional[List[str]] = None,
+             start_year: Optional[int] = None, end_year: Optional[int] = None) -> pd.DataFrame:
+        """Rows for the requested countries and years, in request order"""
+        path = self.partition_path(indicator)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=COLUMNS)
+
+        with tracer.span('store.read', indicator=indicator) as span:
+            with np.load(path) as npz:
+                index = self._index(npz)
+                wanted = [c for c in (countries if countries is not None else index) if c in index]
+                codes, names, years, values = [], [], [], []
+                for code in wanted:
+                    country_years = npz[f'years__{code}']
+                    lo = 0 if start_year is None else np.searchsorted(country_years, start_year, 'left')
+                    hi = len(country_years) if end_year is None else np.searchsorted(country_years, end_year, 'right')
+                    if hi <= lo:
+                        continue
+                    n = hi - lo
+                    years.append(country_years[lo:hi])
+                    values.append(npz[f'values__{code}'][lo:hi])
+                    codes.append(np.full(n, code, dtype=object))
+                    names.append(np.full(n, index[code], dtype=object))
+            span.set('countries', len(wanted))
+
+            if not years:
+                return pd.DataFrame(columns=COLUMNS)
+            df = pd.DataFrame({
+                'country_code': np.concatenate(codes),
+                'country': np.concatenate(names),
+                'year': np.concatenate(years).astype(int),
+                'value': np.concatenate(values),
+                'indicator': indicator,
+            })
+            span.set('rows', len(df))
+        return df
+
+    def _load_partition(self, path: str) -> Dict[str, Dict]:
+        partition = {}
+        if os.path.exists(path):
+            with np.load(path) as npz:
+                for code, name in self._index(npz).items():
+                    partition[code] = {
+                        'name': name,
+                        'years': npz[f'years__{code}'],
+                        'values': npz[f'values__{code}'],
+                        'fetched_at': (float(npz[f'fetched_at__{code}'])
+                                       if f'fetched_at__{code}' in npz.files else 0.0),
+                    }
+        return partition
+
+    def _write_partition(self, path: str, partition: Dict[str, Dict]):
+        codes = sorted(partition)
+        arrays = {
+            'countries': np.array(codes, dtype=str),
+            'names': np.array([partition[c]['name'] for c in codes], dtype=str),
+        }
+        for code in codes:
+            arrays[f'years__{code}'] = partition[code]['years']
+            arrays[f'values__{code}'] = partition[code]['values']
+            arrays[f'fetched_at__{code}'] = np.float64(partition[code]['fetched_at'])
+        # Unique per writer, then renamed over the partition in one step
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def upsert(self, indicator: str, df: pd.DataFrame, fetched_at: Optional[float] = None) -> int:
+        """Merge rows into the partition; new values win on (country, year)
+
+        Every country in `df` is marked as fetched at `fetched_at` (default: now).
+        """
+        if df.empty:
+            return 0
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        path = self.partition_path(indicator)
+        with tracer.span('store.write', indicator=indicator, rows=len(df)):
+            with self._lock, self.lock(indicator):
+                partition = self._load_partition(path)
+                for code, group in df.groupby('country_code'):
+                    new_years = group['year'].to_numpy(dtype=np.int16)
+                    new_values = group['value'].to_numpy(dtype=np.float64)
+                    entry = partition.get(code)
+                    if entry is not None:
+                        # Keep old years the new rows don't cover
+                        keep = ~np.isin(entry['years'], new_years)
+                        new_years = np.concatenate([entry['years'][keep], new_years])
+                        new_values = np.concatenate([entry['values'][keep], new_values])
+                    # Stable sort, last occurrence wins for duplicate years within the batch
+                    order = np.argsort(new_years, kind='stable')
+                    new_years, new_values = new_years[order], new_values[order]
+                    last = np.append(new_years[1:] != new_years[:-1], True)
+                    partition[code] = {
+                        'name': str(group['country'].iloc[-1]),
+                        'years': new_years[last],
+                        'values': new_values[last],
+                        'fetched_at': fetched_at,
+                    }
+                self._write_partition(path, partition)
+        return len(df)
+
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(os.path.join(self.root, f))
+                   for f in os.listdir(self.root) if f.endswith('.npz'))
+
+    def stats(self) -> Dict:
+        return {
+            'indicators': len(self.indicators()),
+            'bytes': self.size_bytes(),
+            'locks': self.lock_stats.to_dict(),
+        }
+
+
+def _legacy_files(cache_dir: str) -> List[tuple]:
+    """(indicator, path) for old per-combination files and per-country entries"""
+    found = []
+    for entry in sorted(os.listdir(cache_dir)):
+        path = os.path.join(cache_dir, entry)
+        if os.path.isdir(path):
+            # data/country_cache/<indicator>/<country>.csv
+            for filename in sorted(os.listdir(path)):
+                if filename.endswith('.csv'):
+                    found.append((entry, os.path.join(path, filename)))
+        elif entry.endswith('.csv'):
+            # data/country_cache/<indicator>_<countries...>_<start>_<end>.csv
+            found.append((entry.split('_')[0], path))
+    return found
+
+
+def migrate(cache_dir: str, store: ComparisonStore) -> Dict:
+    """Import every cache CSV into the store, deduplicating on (indicator, country, year)
+
+    When files disagree, the most recently written file wins.
+    """
+    by_indicator: Dict[str, List[pd.DataFrame]] = {}
+    files = _legacy_files(cache_dir)
+    for indicator, path in files:
+        try:
+            df = pd.read_csv(path)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError) as e:
+            print(f"Skipping unreadable cache file {path}: {e}")
+            continue
+        if not set(COLUMNS[:4]).issubset(df.columns):
+            print(f"Skipping {path}: unexpected columns {list(df.columns)}")
+            continue
+        df['_mtime'] = os.path.getmtime(path)
+        by_indicator.setdefault(indicator, []).append(df)
+
+    report = {'files': len(files), 'rows_read': 0, 'rows_stored': 0, 'indicators': {}}
+    for indicator, frames in by_indicator.items():
+        combined = pd.concat(frames, ignore_index=True)
+        report['rows_read'] += len(combined)
+        deduped = (combined.sort_values('_mtime', kind='stable')
+                   .drop_duplicates(['country_code', 'year'], keep='last'))
+        # The oldest file decides when the imported data expires
+        store.upsert(indicator, deduped.drop(columns='_mtime'), fetched_at=deduped['_mtime'].min())
+        report['rows_stored'] += len(deduped)
+        report['indicators'][indicator] = {
+            'files': len(frames),
+            'countries': int(deduped['country_code'].nunique()),
+            'rows': len(deduped),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Comparison store maintenance")
+    sub = parser.add_subparsers(dest='command', required=True)
+    mig = sub.add_parser('migrate', help='import and deduplicate data/country_cache CSV files')
+    mig.add_argument('--cache-dir', default=os.path.join('data', 'country_cache'))
+    mig.add_argument('--store', default=os.path.join('data', 'comparison_store'))
+    args = parser.parse_args()
+
+    store = ComparisonStore(args.store)
+    report = migrate(args.cache_dir, store)
+    print(f"Imported {report['files']} files: {report['rows_read']} rows read, "
+          f"{report['rows_stored']} unique rows stored")
+    for indicator, info in sorted(report['indicators'].items()):
+        print(f"  {indicator:<22} {info['files']:>3} files -> "
+              f"{info['countries']:>3} countries, {info['rows']:>5} rows")
+    print(f"Store size: {store.size_bytes() / 1024:.1f} KB in {args.store}")
@@ -0,0 +1,107 @@
+"""
+Country Metadata for IndianPulse
+The World Bank economies and aggregates available for comparison
+"""
+
+import csv
+import json
+import os
+import zlib
+from typing import Dict, List
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+METADATA_FILE = os.path.join(DATA_DIR, 'country_metadata.csv')
+PEER_GROUPS_FILE = os.path.join(DATA_DIR, 'peer_groups.json')
+
+# Aggregates and economies without an ISO alpha-2 code have no flag of their own
+AGGREGATE_FLAG = '🌐'
+
+SCOPES = ('featured', 'economies', 'aggregates', 'all')
+
+
+def flag_emoji(iso2: str) -> str:
+    """Regional-indicator flag for an ISO 3166 alpha-2 code"""
+    if len(iso2) != 2 or not iso2.isalpha():
+        return AGGREGATE_FLAG
+    return ''.join(chr(0x1F1E6 + ord(letter) - ord('A')) for letter in iso2.upper())
+
+
+def default_color(code: str) -> str:
+    """A stable, mid-lightness chart color for countries without one of their own"""
+    hue = zlib.crc32(code.encode()) % 360
+    # HSL(hue, 65%, 45%) to RGB
+    c = (1 - abs(2 * 0.45 - 1)) * 0.65
+    x = c * (1 - abs((hue / 60) % 2 - 1))
+    m = 0.45 - c / 2
+    r, g, b = [(c, x, 0), (x, c, 0), (0, c, x), (0, x, c), (x, 0, c), (c, 0, x)][hue // 60]
+    return '#{:02X}{:02X}{:02X}'.format(*(round((v + m) * 255) for v in (r, g, b)))
+
+
+def load_country_metadata(path: str = METADATA_FILE) -> Dict[str, Dict]:
+    """Country code -> name, flag, color, iso2, region, income_group, aggregate, featured
+
+    Read with the csv module rather than pandas so codes like Namibia's 'NA'
+    stay strings. `featured` is the position in the default selection, or 0.
+    """
+    countries = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            code = row['code']
+            aggregate = row['type'] == 'aggregate'
+            countries[code] = {
+                'name': row['name'],
+                'flag': AGGREGATE_FLAG if aggregate else flag_emoji(row['iso2']),
+                'color': row['color'] or default_color(code),
+                'iso2': row['iso2'],
+                'region': row['region'] or None,
+                'income_group': row['income_group'] or None,
+                'aggregate': aggregate,
+                'featured': int(row['featured'] or 0),
+            }
+    return countries
+
+
+def featured(countries: Dict[str, Dict]) -> Dict[str, Dict]:
+    """The default comparison selection, in its configured order"""
+    chosen = sorted((info['featured'], code) for code, info in countries.items() if info['featured'])
+    return {code: countries[code] for _, code in chosen}
+
+
+def scope_codes(countries: Dict[str, Dict], scope: str) -> List[str]:
+    """Codes in one of SCOPES"""
+    if scope == 'featured':
+        return list(featured(countries))
+    if scope == 'economies':
+        return [code for code, info in countries.items() if not info['aggregate']]
+    if scope == 'aggregates':
+        return [code for code, info in countries.items() if info['aggregate']]
+    if scope == 'all':
+        return list(countries)
+    raise ValueError(f"Unknown scope '{scope}'; expected one of {', '.join(SCOPES)}")
+
+
+def load_peer_groups(countries: Dict[str, Dict], path: str = PEER_GROUPS_FILE) -> Dict[str, List[str]]:
+    """Group name -> member codes
+
+    The groups listed in `path` come first, then 'World' (every economy), each
+    region and each income group from the metadata.
+    """
+    with open(path, encoding='utf-8') as f:
+        groups = {name: [code for code in codes if code in countries]
+                  for name, codes in json.load(f).items()}
+    economies = {code: info for code, info in countries.items() if not info['aggregate']}
+    groups['World'] = list(economies)
+    for key in ('region', 'income_group'):
+        for code, info in economies.items():
+            if info[key]:
+                groups.setdefault(info[key], []).append(code)
+    return groups
+
+
+def default_peer_groups(countries: Dict[str, Dict], code: str, groups: Dict[str, List[str]]) -> List[str]:
+    """The listed groups `code` belongs to, then its region, income group and the world"""
+    info = countries.get(code, {})
+    chosen = [name for name, members in groups.items()
+              if code in members and name not in ('World', info.get('region'), info.get('income_group'))]
+    chosen += [name for name in (info.get('region'), info.get('income_group')) if name in groups]
+    return chosen + ['World']
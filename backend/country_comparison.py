@@ -6,27 +6,57 @@ Compares India with other major economies using World Bank and OECD data
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import requests
 from typing import Dict, List, Optional
+from collections import OrderedDict
 import os
 import json
+import threading
+import time
+import zlib
+
+from backend.comparison_store import ComparisonStore
+from backend.countries import (AGGREGATE_FLAG, default_color, default_peer_groups,
+                               featured as featured_countries, load_country_metadata,
+                               load_peer_groups, scope_codes)
+from backend.export_pipeline import ExportPipeline
+from backend.frame_cache import FrameLRU
+from backend.panel import CountryPanel
+from backend.peers import PeerIndex
+from backend.rankings import RankingTable
+from backend.refresh import BackgroundRefresher
+from backend.relative import MODES as RELATIVE_MODES, RelativeIndex
+from backend.singleflight import SingleFlight
+from backend.tracing import tracer
+from backend.worldbank import WorldBankClient
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: well-spread 64-bit hashes of integer keys"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _seeded_normal(seeds: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """Standard normal noise for every (seed, year) pair, reproducible cell by cell"""
+    with np.errstate(over='ignore'):
+        cells = seeds[:, None] * np.uint64(0x9E3779B97F4A7C15) + years.astype(np.uint64)[None, :]
+        u1 = ((_mix64(cells) >> np.uint64(11)).astype(float) + 0.5) / 2.0 ** 53
+        u2 = (_mix64(cells ^ np.uint64(0xD1B54A32D192ED03)) >> np.uint64(11)).astype(float) / 2.0 ** 53
+    # Box-Muller
+    return np.sqrt(-2 * np.log(u1)) * np.cos(2 * np.pi * u2)
+
 
 class CountryComparison:
     """Handle country-to-country economic comparisons"""
     
-    # Major economies to compare with India
-    COMPARISON_COUNTRIES = {
-        'IND': {'name': 'India', 'flag': '🇮🇳', 'color': '#FF9933'},
-        'CHN': {'name': 'China', 'flag': '🇨🇳', 'color': '#DE2910'},
-        'USA': {'name': 'United States', 'flag': '🇺🇸', 'color': '#3C3B6E'},
-        'GBR': {'name': 'United Kingdom', 'flag': '🇬🇧', 'color': '#012169'},
-        'JPN': {'name': 'Japan', 'flag': '🇯🇵', 'color': '#BC002D'},
-        'DEU': {'name': 'Germany', 'flag': '🇩🇪', 'color': '#000000'},
-        'BRA': {'name': 'Brazil', 'flag': '🇧🇷', 'color': '#009739'},
-        'RUS': {'name': 'Russia', 'flag': '🇷🇺', 'color': '#0033A0'},
-        'ZAF': {'name': 'South Africa', 'flag': '🇿🇦', 'color': '#007749'},
-        'AUS': {'name': 'Australia', 'flag': '🇦🇺', 'color': '#00008B'},
-    }
+    # Every World Bank economy and aggregate, from data/country_metadata.csv
+    COUNTRIES = load_country_metadata()
+    
+    # Major economies to compare with India (the default selection)
+    COMPARISON_COUNTRIES = featured_countries(COUNTRIES)
+    
+    # Named peer groups (data/peer_groups.json), then the world, regions and income groups
+    PEER_GROUPS = load_peer_groups(COUNTRIES)
     
     # World Bank indicator codes
     WB_INDICATORS = {
@@ -40,82 +70,287 @@ class CountryComparison:
         'trade_gdp': 'NE.TRD.GNFS.ZS',  # Trade (% of GDP)
     }
     
+    # Baselines and modes toggled in the relative view
+    RELATIVE_CACHE_SIZE = 64
+    # Synthetic panels (one per country list) and the ranking tables over them
+    SYNTHETIC_PANEL_CACHE_SIZE = 32
+    RANKING_CACHE_SIZE = 32
+    
+    # Parts of a get_comparison_data result; 'values' and 'stats' add to 'countries'
+    COMPARISON_FIELDS = ('years', 'countries', 'values', 'stats', 'rankings', 'india_position')
+    
+    # Every entry is fetched over this range; request ranges are filters over it
+    CANONICAL_START_YEAR = 1960
+    CANONICAL_END_YEAR = datetime.now().year
+    
+    # How long to wait for another process fetching the same indicator before fetching anyway
+    FETCH_LOCK_TIMEOUT = float(os.environ.get('WORLD_BANK_FETCH_LOCK_TIMEOUT', 60))
+    
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
         self.cache_dir = os.path.join(data_dir, 'country_cache')
         os.makedirs(self.cache_dir, exist_ok=True)
-        self.cache = {}
-        
+        self.store = ComparisonStore(os.path.join(data_dir, 'comparison_store'))
+        self.client = WorldBankClient()
+        # Parsed (indicator, country) frames, dropped when the store partition changes on disk
+        self.cache = FrameLRU(int(float(os.environ.get('COMPARISON_CACHE_MB', 64)) * 1024 * 1024))
+        # Coalesce concurrent identical fetches and comparisons
+        self._fetch_flight = SingleFlight('worldbank.fetch')
+        self._comparison_flight = SingleFlight('comparison')
+        # Countries another process fetched while this one waited on the fetch lock
+        self.fetched_by_peers = 0
+        # Expired entries are served as-is and refreshed in the background
+        self.refresher = BackgroundRefresher(self)
+        # indicator -> (store signature, CountryPanel over every stored country)
+        self._panels: Dict[str, tuple] = {}
+        # (indicator, country tuple) -> synthetic CountryPanel, least recently used first
+        self._synthetic_panels: 'OrderedDict[tuple, CountryPanel]' = OrderedDict()
+        self._synthetic_lock = threading.Lock()
+        # (indicator, id of the panel) -> RankingTable, least recently used first; the table
+        # keeps its panel alive, so the id can't be reused while the entry exists
+        self._rankings: 'OrderedDict[tuple, RankingTable]' = OrderedDict()
+        self._rankings_lock = threading.Lock()
+        # indicator -> PeerIndex over the current panel of every economy
+        self._peers: Dict[str, PeerIndex] = {}
+        # (indicator, id of the panel, base country, base year, mode) -> RelativeIndex,
+        # least recently used first
+        self._relative: 'OrderedDict[tuple, RelativeIndex]' = OrderedDict()
+        self._relative_lock = threading.Lock()
+        
+    def country_info(self, code: str, name: str = None) -> Dict:
+        """Metadata for a country; codes missing from the table get a generic entry"""
+        info = self.COUNTRIES.get(code)
+        if info is None:
+            info = {'name': name or code, 'flag': AGGREGATE_FLAG, 'color': default_color(code),
+                    'iso2': '', 'region': None, 'income_group': None, 'aggregate': False,
+                    'featured': 0}
+        return info
+    
+    def universe(self, scope: str = 'economies') -> List[str]:
+        """Country codes in a scope: 'featured', 'economies', 'aggregates' or 'all'"""
+        return scope_codes(self.COUNTRIES, scope)
+    
     def fetch_world_bank_data(self, indicator: str, country_codes: List[str], 
                               start_year: int = 2010, end_year: int = 2024) -> pd.DataFrame:
-        """Fetch data from World Bank API"""
-        
-        # Check cache first
-        cache_key = f"{indicator}_{'_'.join(country_codes)}_{start_year}_{end_year}"
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.csv")
-        
-        if os.path.exists(cache_file):
-            print(f"Loading cached data for {indicator}")
-            return pd.read_csv(cache_file)
-        
-        all_data = []
-        
-        for country_code in country_codes:
-            try:
-                # World Bank API endpoint
-                url = f"https://api.worldbank.org/v2/country/{country_code}/indicator/{indicator}"
-                params = {
-                    'format': 'json',
-                    'date': f'{start_year}:{end_year}',
-                    'per_page': 500
-                }
-                
-                print(f"Fetching {indicator} data for {country_code}...")
-                response = requests.get(url, params=params, timeout=10)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if len(data) > 1 and data[1]:
-                        for item in data[1]:
-                            if item['value'] is not None:
-                                all_data.append({
-                                    'country_code': country_code,
-                                    'country': item['country']['value'],
-                                    'year': int(item['date']),
-                                    'value': float(item['value']),
-                                    'indicator': indicator
-                                })
-            except Exception as e:
-                print(f"Error fetching data for {country_code}: {e}")
-                continue
-        
-        if all_data:
-            df = pd.DataFrame(all_data)
-            df.to_csv(cache_file, index=False)
+        """Fetch data from World Bank API
+        
+        Data is cached per (indicator, country), so any combination or ordering
+        of countries is assembled from the same entries and only countries that
+        were never fetched go to the API. Expired entries are returned
+        immediately and refreshed in the background.
+        """
+        
+        # Already limited to the range, so only the requested years are concatenated
+        frames = self._ensure_countries(indicator, country_codes, start_year, end_year)
+        sliced = [frames[code] for code in country_codes if code in frames and len(frames[code])]
+        if not sliced:
+            return pd.DataFrame()
+        return pd.concat(sliced, ignore_index=True)
+    
+    @staticmethod
+    def _slice_years(df: pd.DataFrame, start_year: int = None, end_year: int = None) -> pd.DataFrame:
+        """Rows of a year-sorted frame within `start_year`..`end_year`"""
+        if start_year is None and end_year is None:
             return df
+        years = df['year'].to_numpy()
+        lo = 0 if start_year is None else np.searchsorted(years, start_year, 'left')
+        hi = len(years) if end_year is None else np.searchsorted(years, end_year, 'right')
+        return df.iloc[lo:hi]
+    
+    def _ensure_countries(self, indicator: str, country_codes: List[str],
+                          start_year: int = None, end_year: int = None) -> Dict[str, pd.DataFrame]:
+        """Per-country frames within the year range, fetching countries that were never stored"""
+        
+        frames = self._load_countries(indicator, country_codes, start_year, end_year)
+        self.refresher.serve_stale(indicator, [code for code in country_codes if code in frames])
+        missing = [code for code in country_codes if code not in frames]
+        if missing:
+            key = (indicator, tuple(sorted(missing)))
+            fetched = self._fetch_flight.do(key, self._fetch_and_store, indicator, missing)
+            frames.update({code: self._slice_years(df, start_year, end_year)
+                           for code, df in fetched.items()})
+        return frames
+    
+    def _load_countries(self, indicator: str, country_codes: List[str],
+                        start_year: int = None, end_year: int = None) -> Dict[str, pd.DataFrame]:
+        """Cached frames for the requested countries, from memory, the store or legacy files
+        
+        Every frame returned is limited to `start_year`..`end_year`. Frames
+        cached under (indicator, country) cover the canonical range and are
+        sliced; the store slices its arrays before any frame is built, and a
+        ranged read is cached under its range as well.
+        """
+        
+        signature = self.store.signature(indicator)
+        full = start_year is None and end_year is None
+        frames = {}
+        with tracer.span('frames.lookup', indicator=indicator, countries=len(country_codes)) as span:
+            for code in country_codes:
+                keys = [(indicator, code)]
+                if not full:
+                    keys.append((indicator, code, start_year, end_year))
+                df = self.cache.get_any(keys, signature)
+                if df is not None:
+                    frames[code] = self._slice_years(df, start_year, end_year)
+            # Otherwise the store read below says whether the data was there
+            if len(frames) == len(country_codes):
+                span.set('cache', 'hit')
+        
+        missing = [code for code in country_codes if code not in frames]
+        if missing:
+            with tracer.span('worldbank.cache_read', indicator=indicator) as span:
+                df = self.store.read(indicator, missing, start_year, end_year)
+                read = {code: group.reset_index(drop=True)
+                        for code, group in df.groupby('country_code', sort=False)}
+                if not full:
+                    # Stored countries with nothing in the range are held, not missing
+                    held = self.store.fetched_at(indicator)
+                    read.update({code: df.iloc[:0] for code in missing
+                                 if code in held and code not in read})
+                span.set('rows', len(df))
+                # A miss: some countries still have to come from legacy files or the API
+                span.set('cache', 'hit' if len(read) == len(missing) else 'miss')
+            for code, frame in read.items():
+                key = (indicator, code) if full else (indicator, code, start_year, end_year)
+                self.cache.put(key, frame, signature)
+            frames.update(read)
+        
+        missing = [code for code in country_codes if code not in frames]
+        if missing:
+            frames.update({code: self._slice_years(df, start_year, end_year)
+                           for code, df in self._import_legacy_files(indicator, missing).items()})
+        return frames
+    
+    def _cache_frames(self, indicator: str, frames: Dict[str, pd.DataFrame]):
+        """Remember frames just written to the store under its new signature"""
+        signature = self.store.signature(indicator)
+        for code, df in frames.items():
+            self.cache.put((indicator, code), df, signature)
+    
+    def _import_legacy_files(self, indicator: str, country_codes: List[str]) -> Dict[str, pd.DataFrame]:
+        """Move countries out of old per-combination cache files into per-country entries"""
+        
+        wanted = set(country_codes)
+        candidates = []
+        for filename in os.listdir(self.cache_dir):
+            parts = filename[:-len('.csv')].split('_')
+            if not filename.endswith('.csv') or parts[0] != indicator or len(parts) < 4:
+                continue
+            codes = set(parts[1:-2])
+            if codes & wanted:
+                candidates.append((len(codes), filename))
+        
+        frames = {}
+        mtimes = []
+        # Larger combinations first: one file usually covers every wanted country
+        for _, filename in sorted(candidates, reverse=True):
+            if wanted.issubset(frames):
+                break
+            path = os.path.join(self.cache_dir, filename)
+            with tracer.span('worldbank.cache_read', indicator=indicator, file=filename) as span:
+                df = pd.read_csv(path)
+                span.set('rows', len(df))
+                span.set('cache', 'hit' if df['country_code'].isin(list(wanted)).any() else 'miss')
+            mtimes.append(os.path.getmtime(path))
+            for code, group in df.groupby('country_code'):
+                if code in wanted and code not in frames:
+                    frames[code] = group.sort_values('year').reset_index(drop=True)
+        
+        if frames:
+            # Imported data expires as if fetched when the oldest file was written
+            self.store.upsert(indicator, pd.concat(frames.values(), ignore_index=True),
+                              fetched_at=min(mtimes))
+            self._cache_frames(indicator, frames)
+        return frames
+    
+    def _fetch_and_store(self, indicator: str, country_codes: List[str],
+                         since: float = 0.0) -> Dict[str, pd.DataFrame]:
+        """Fetch countries over the canonical year range and store them
+        
+        Workers share the store, so the fetch runs under a per-indicator file
+        lock. Countries stored by another process after `since` (typically
+        while this one waited for the lock) are read back instead of fetched.
+        """
+        
+        with self.store.lock(indicator, 'fetch', timeout=self.FETCH_LOCK_TIMEOUT):
+            fetched_at = self.store.fetched_at(indicator)
+            done = [code for code in country_codes if fetched_at.get(code, -1.0) >= since]
+            frames = {}
+            if done:
+                df = self.store.read(indicator, done)
+                for code, group in df.groupby('country_code', sort=False):
+                    frames[code] = group.reset_index(drop=True)
+                self._cache_frames(indicator, frames)
+                self.fetched_by_peers += len(frames)
+            
+            remaining = [code for code in country_codes if code not in frames]
+            if not remaining:
+                return frames
+            with tracer.span('worldbank.fetch', indicator=indicator, countries=len(remaining),
+                             cache='miss') as span:
+                df = self._fetch_from_api(indicator, remaining,
+                                          self.CANONICAL_START_YEAR, self.CANONICAL_END_YEAR)
+                span.set('rows', len(df))
+            
+            if not df.empty:
+                self.store.upsert(indicator, df)
+                # One sort for every country, then contiguous slices
+                df = df.sort_values(['country_code', 'year'], kind='stable')
+                fetched = {code: group.reset_index(drop=True)
+                           for code, group in df.groupby('country_code', sort=False)}
+                self._cache_frames(indicator, fetched)
+                frames.update(fetched)
+        return frames
+    
+    def refresh(self, indicator: str, country_codes: List[str]) -> Dict[str, pd.DataFrame]:
+        """Re-fetch countries already held, replacing their stored series"""
+        key = (indicator, tuple(sorted(country_codes)))
+        # Only a refresh by another process from now on makes a re-fetch unnecessary
+        return self._fetch_flight.do(key, self._fetch_and_store, indicator, country_codes,
+                                     since=time.time())
+    
+    def _fetch_from_api(self, indicator: str, country_codes: List[str],
+                        start_year: int, end_year: int) -> pd.DataFrame:
+        """Request every country's series from the World Bank API concurrently"""
         
-        return pd.DataFrame()
+        return self.client.fetch_indicator(indicator, country_codes, start_year, end_year)
     
     def generate_comparison_csv(self, indicator_name: str, wb_indicator: str, 
-                                countries: List[str] = None) -> pd.DataFrame:
+                                countries: List[str] = None, start_year: int = 2010,
+                                end_year: int = 2024) -> pd.DataFrame:
         """Generate comparison CSV for a specific indicator"""
         
         if countries is None:
             countries = list(self.COMPARISON_COUNTRIES.keys())
         
-        df = self.fetch_world_bank_data(wb_indicator, countries)
+        df = self.fetch_world_bank_data(wb_indicator, countries, start_year, end_year)
         
         if df.empty:
             print(f"No data available for {indicator_name}")
-            return self._generate_synthetic_comparison_data(indicator_name, countries)
+            return self._generate_synthetic_comparison_data(indicator_name, countries, start_year, end_year)
         
         return df
     
-    def _generate_synthetic_comparison_data(self, indicator: str, countries: List[str]) -> pd.DataFrame:
-        """Generate realistic synthetic comparison data"""
-        
-        years = list(range(2010, 2025))
-        data = []
+    def _generate_synthetic_comparison_data(self, indicator: str, countries: List[str],
+                                            start_year: int = 2010, end_year: int = 2024) -> pd.DataFrame:
+        """Generate realistic synthetic comparison data
+        
+        Values are a pure function of (indicator, country, year), so repeated
+        requests and any subset of countries or years agree, and the frames are
+        cached like fetched data.
+        """
+        
+        key = ('synthetic', indicator, tuple(countries), start_year, end_year)
+        df = self.cache.get(key, 'synthetic')
+        if df is None:
+            with tracer.span('synthetic.generate', indicator=indicator, countries=len(countries)):
+                df = self._build_synthetic_frame(indicator, countries, start_year, end_year)
+            self.cache.put(key, df, 'synthetic')
+        return df
+    
+    def _build_synthetic_frame(self, indicator: str, countries: List[str],
+                               start_year: int = 2010, end_year: int = 2024) -> pd.DataFrame:
+        years = np.arange(start_year, end_year + 1)
         
         # Base values and growth patterns for different indicators
         base_values = {
@@ -129,159 +364,472 @@ class CountryComparison:
                          'DEU': 85.0, 'BRA': 25.0, 'RUS': 48.0, 'ZAF': 58.0, 'AUS': 42.0},
         }
         
-        base = base_values.get(indicator, {country: 5.0 for country in countries})
-        
-        for country_code in countries:
-            country_base = base.get(country_code, 5.0)
-            
-            for i, year in enumerate(years):
-                # Add some variation and trends
-                trend = np.sin(i * 0.5) * 2
-                noise = np.random.normal(0, 1.5)
-                
-                # COVID-19 impact in 2020
-                covid_impact = -15 if year == 2020 and indicator == 'gdp_growth' else 0
-                covid_impact += 10 if year == 2020 and indicator == 'unemployment' else 0
-                
-                value = country_base + trend + noise + covid_impact
-                
-                data.append({
-                    'country_code': country_code,
-                    'country': self.COMPARISON_COUNTRIES[country_code]['name'],
-                    'year': year,
-                    'value': round(value, 2),
-                    'indicator': indicator
-                })
-        
-        return pd.DataFrame(data)
+        base = base_values.get(indicator, {})
+        country_base = np.array([base.get(code, 5.0) for code in countries])[:, None]
+        
+        # Add some variation and trends (the cycle is anchored at 2010)
+        trend = np.sin((years - 2010) * 0.5) * 2
+        seeds = np.array([zlib.crc32(f"{indicator}:{code}".encode()) for code in countries], dtype=np.uint64)
+        noise = _seeded_normal(seeds, years) * 1.5
+        
+        # COVID-19 impact in 2020
+        covid_impact = np.zeros(len(years))
+        if indicator == 'gdp_growth':
+            covid_impact[years == 2020] = -15
+        elif indicator == 'unemployment':
+            covid_impact[years == 2020] = 10
+        
+        values = np.round(country_base + trend + noise + covid_impact, 2)
+        
+        return pd.DataFrame({
+            'country_code': np.repeat(countries, len(years)),
+            'country': np.repeat([self.country_info(code)['name'] for code in countries], len(years)),
+            'year': np.tile(years, len(countries)),
+            'value': values.ravel(),
+            'indicator': indicator
+        })
     
     def get_comparison_data(self, indicator: str, countries: List[str] = None, 
-                           start_year: int = 2010, end_year: int = 2024) -> Dict:
-        """Get comparison data formatted for frontend"""
+                           start_year: int = 2010, end_year: int = 2024,
+                           fields: List[str] = None) -> Dict:
+        """Get comparison data formatted for frontend
+        
+        `fields` limits the result to some of COMPARISON_FIELDS (default: all);
+        parts that aren't requested aren't computed. The result may be shared
+        with concurrent callers; copy it before mutating.
+        """
         
         if countries is None:
             countries = ['IND', 'CHN', 'USA', 'GBR', 'JPN', 'DEU']
+        fields = frozenset(self.COMPARISON_FIELDS if fields is None else fields)
+        unknown = fields.difference(self.COMPARISON_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        
+        key = (indicator, tuple(countries), start_year, end_year, fields)
+        return self._comparison_flight.do(key, self._build_comparison_data, indicator,
+                                          countries, start_year, end_year, fields)
+    
+    def get_panel(self, indicator: str, countries: List[str]) -> CountryPanel:
+        """Country x year panel for an indicator, covering `countries` where data exists
         
-        # Map indicator names to World Bank codes
+        World Bank panels hold every stored country over the canonical range and
+        are rebuilt only when the store partition changes. Shared; don't mutate.
+        """
         wb_code = self.WB_INDICATORS.get(indicator)
         
         if wb_code:
-            df = self.generate_comparison_csv(indicator, wb_code, countries)
-        else:
-            df = self._generate_synthetic_comparison_data(indicator, countries)
-        
-        # Filter by year range
-        df = df[(df['year'] >= start_year) & (df['year'] <= end_year)]
-        
-        # Prepare data for frontend
-        result = {
-            'years': sorted(df['year'].unique().tolist()),
-            'countries': {},
-            'india_position': None,
-            'rankings': []
+            with tracer.span('panel.lookup', indicator=indicator) as span:
+                cached = self._panels.get(indicator)
+                hit = False
+                if cached is not None and cached[0] == self.store.signature(wb_code):
+                    # Countries recently found to have no data don't force a rebuild
+                    absent = [code for code in countries if cached[1].row(code) is None]
+                    hit = not absent or not self.client.negative.filter(wb_code, absent)
+                span.set('cache', 'hit' if hit else 'miss')
+            if hit:
+                self.refresher.serve_stale(wb_code, countries)
+                return cached[1]
+            
+            # Fetch or import only what the store lacks, then pivot the whole partition once;
+            # nothing is assembled per country, which matters across hundreds of them
+            held = self.store.fetched_at(wb_code)
+            missing = [code for code in countries if code not in held]
+            if missing:
+                self._ensure_countries(wb_code, missing)
+            self.refresher.serve_stale(wb_code, [code for code in countries if code in held])
+            
+            signature = self.store.signature(wb_code)
+            cached = self._panels.get(indicator)
+            if cached is not None and cached[0] == signature:
+                panel = cached[1]
+            elif signature is not None:
+                with tracer.span('panel.build', indicator=indicator) as span:
+                    panel = CountryPanel.from_frame(self.store.read(wb_code))
+                    span.set('countries', len(panel))
+                self._panels[indicator] = (signature, panel)
+            else:
+                panel = None
+            if panel is not None and any(panel.row(code) is not None for code in countries):
+                return panel
+            print(f"No data available for {indicator}")
+        
+        return self._synthetic_panel(indicator, countries)
+    
+    def _synthetic_panel(self, indicator: str, countries: List[str]) -> CountryPanel:
+        """Panel of synthetic data for `countries`, kept so tables built over it are reused"""
+        key = (indicator, tuple(countries))
+        with self._synthetic_lock:
+            panel = self._synthetic_panels.get(key)
+            if panel is not None:
+                self._synthetic_panels.move_to_end(key)
+                return panel
+        
+        panel = CountryPanel.from_frame(self._generate_synthetic_comparison_data(indicator, countries))
+        with self._synthetic_lock:
+            panel = self._synthetic_panels.setdefault(key, panel)
+            while len(self._synthetic_panels) > self.SYNTHETIC_PANEL_CACHE_SIZE:
+                self._synthetic_panels.popitem(last=False)
+        return panel
+    
+    def get_ranking_table(self, indicator: str, countries: List[str]) -> RankingTable:
+        """Ranks for every year of the indicator's panel, rebuilt when the panel changes"""
+        panel = self.get_panel(indicator, countries)
+        key = (indicator, id(panel))
+        with self._rankings_lock:
+            table = self._rankings.get(key)
+            if table is not None and table.panel is panel:
+                self._rankings.move_to_end(key)
+                return table
+        
+        with tracer.span('rankings.build', indicator=indicator, countries=len(panel)):
+            table = RankingTable(panel)
+        with self._rankings_lock:
+            self._rankings[key] = table
+            # Tables over replaced World Bank panels age out here too
+            while len(self._rankings) > self.RANKING_CACHE_SIZE:
+                self._rankings.popitem(last=False)
+        return table
+    
+    def get_rankings(self, indicator: str, countries: List[str] = None, year: int = None,
+                     end_year: int = 2024) -> Dict:
+        """Rankings among `countries` for `year` (default: the latest reported year)"""
+        
+        if countries is None:
+            countries = ['IND', 'CHN', 'USA', 'GBR', 'JPN', 'DEU']
+        
+        table = self.get_ranking_table(indicator, countries)
+        if year is None:
+            year = table.latest_year(countries, end_year)
+        rankings = table.for_year(year, countries) if year is not None else []
+        india = [row['rank'] for row in rankings if row['country_code'] == 'IND']
+        return {
+            'indicator': indicator,
+            'year': year,
+            'rankings': rankings,
+            'india_position': india[0] if india else None
         }
+    
+    def get_rank_history(self, indicator: str, country: str = 'IND',
+                         countries: List[str] = None) -> Dict:
+        """A country's rank among `countries` in every year it reported"""
         
-        for country_code in countries:
-            country_data = df[df['country_code'] == country_code].sort_values('year')
-            if not country_data.empty:
-                result['countries'][country_code] = {
-                    'name': self.COMPARISON_COUNTRIES[country_code]['name'],
-                    'flag': self.COMPARISON_COUNTRIES[country_code]['flag'],
-                    'color': self.COMPARISON_COUNTRIES[country_code]['color'],
-                    'values': country_data['value'].tolist(),
-                    'latest': float(country_data.iloc[-1]['value']),
-                    'change': float(country_data.iloc[-1]['value'] - country_data.iloc[0]['value']) if len(country_data) > 1 else 0,
-                    'average': float(country_data['value'].mean())
-                }
+        if countries is None:
+            countries = ['IND', 'CHN', 'USA', 'GBR', 'JPN', 'DEU']
+        if country not in countries:
+            countries = [country] + countries
         
-        # Calculate rankings for latest year
-        latest_data = df[df['year'] == df['year'].max()].sort_values('value', ascending=False)
-        result['rankings'] = latest_data[['country_code', 'country', 'value']].to_dict('records')
+        table = self.get_ranking_table(indicator, countries)
+        return {'indicator': indicator, 'country': country, **table.history(country, countries)}
+    
+    def _universe_year(self, table: RankingTable, countries: List[str], year: Optional[int],
+                       end_year: int) -> Optional[int]:
+        """`year`, or the latest year most of the universe has reported"""
+        return year if year is not None else table.latest_year(countries, end_year, min_share=0.5)
+    
+    def get_top_countries(self, indicator: str, n: int = 10, year: int = None,
+                          scope: str = 'economies', ascending: bool = False,
+                          country: str = 'IND', end_year: int = 2024) -> Dict:
+        """The top (or bottom) `n` of a scope in one year, and where `country` stands"""
+        
+        countries = self.universe(scope)
+        table = self.get_ranking_table(indicator, countries)
+        year = self._universe_year(table, countries, year, end_year)
+        top = table.top(year, n, countries, ascending, include=country) if year is not None else {}
+        
+        def with_flag(row):
+            info = self.country_info(row['country_code'], row['country'])
+            return dict(row, country=info['name'], flag=info['flag'])
+        
+        return {
+            'indicator': indicator,
+            'year': year,
+            'scope': scope,
+            'order': 'ascending' if ascending else 'descending',
+            'out_of': top.get('out_of', 0),
+            'rankings': [with_flag(row) for row in top.get('rankings', [])],
+            'country': with_flag(top['included']) if top.get('included') else None,
+        }
+    
+    def get_percentiles(self, indicator: str, percentiles: List[float] = (10, 25, 50, 75, 90),
+                        year: int = None, scope: str = 'economies', country: str = 'IND',
+                        end_year: int = 2024) -> Dict:
+        """Percentile cutoffs across a scope in one year, and `country`'s value and rank"""
+        
+        countries = self.universe(scope)
+        table = self.get_ranking_table(indicator, countries)
+        year = self._universe_year(table, countries, year, end_year)
+        if year is None:
+            return {'indicator': indicator, 'year': None, 'scope': scope, 'count': 0,
+                    'percentiles': {}, 'mean': None, 'std': None, 'country': None}
+        distribution = table.distribution(year, countries, percentiles)
+        included = table.top(year, 0, countries, include=country)['included']
+        return {'indicator': indicator, 'year': year, 'scope': scope, **distribution,
+                'country': included}
+    
+    def get_peer_index(self, indicator: str) -> PeerIndex:
+        """Every economy's standing in every peer group, rebuilt when the panel changes"""
+        panel = self.get_panel(indicator, self.universe('economies'))
+        index = self._peers.get(indicator)
+        if index is None or index.panel is not panel:
+            with tracer.span('peers.build', indicator=indicator, countries=len(panel),
+                             groups=len(self.PEER_GROUPS)):
+                index = PeerIndex(panel, self.PEER_GROUPS)
+            self._peers[indicator] = index
+        return index
+    
+    def _peer_groups(self, country: str, groups: Optional[List[str]]) -> List[str]:
+        if groups is None:
+            return default_peer_groups(self.COUNTRIES, country, self.PEER_GROUPS)
+        unknown = [name for name in groups if name not in self.PEER_GROUPS]
+        if unknown:
+            raise ValueError(f"Unknown peer group(s): {', '.join(unknown)}")
+        return groups
+    
+    def get_peer_position(self, indicator: str, country: str = 'IND', groups: List[str] = None,
+                          year: int = None, history: bool = False, end_year: int = 2024) -> Dict:
+        """Percentile, z-score and rank of `country` within each peer group
+        
+        `year` defaults to the latest year the country reported; with `history`,
+        every year it can be placed is included as well.
+        """
+        
+        groups = self._peer_groups(country, groups)
+        index = self.get_peer_index(indicator)
+        if year is None:
+            year = index.latest_year(country, end_year)
+        
+        positions = {}
+        for name in groups:
+            position = index.position(country, name, year) if year is not None else None
+            positions[name] = {'members': len(self.PEER_GROUPS[name]), 'position': position}
+            if history:
+                positions[name]['history'] = index.history(country, name)
+        
+        info = self.country_info(country)
+        return {
+            'indicator': indicator,
+            'country': country,
+            'name': info['name'],
+            'flag': info['flag'],
+            'year': year,
+            'groups': positions,
+        }
+    
+    def get_peer_dashboard(self, country: str = 'IND', groups: List[str] = None,
+                           end_year: int = 2024) -> Dict:
+        """`country`'s latest standing in each peer group for every indicator"""
+        
+        groups = self._peer_groups(country, groups)
+        indicators = {}
+        for indicator in self.WB_INDICATORS:
+            result = self.get_peer_position(indicator, country, groups, end_year=end_year)
+            indicators[indicator] = {
+                'year': result['year'],
+                'groups': {name: entry['position'] for name, entry in result['groups'].items()},
+            }
         
-        # Find India's position
-        india_pos = latest_data.reset_index(drop=True)
-        if 'IND' in india_pos['country_code'].values:
-            india_idx = india_pos[india_pos['country_code'] == 'IND'].index[0]
-            result['india_position'] = int(india_idx + 1)
+        info = self.country_info(country)
+        return {
+            'country': country,
+            'name': info['name'],
+            'flag': info['flag'],
+            'groups': {name: len(self.PEER_GROUPS[name]) for name in groups},
+            'indicators': indicators,
+        }
+    
+    def _build_comparison_data(self, indicator: str, countries: List[str],
+                               start_year: int, end_year: int, fields: frozenset) -> Dict:
+        panel = self.get_panel(indicator, countries)
+        
+        # Requested countries and years only
+        with tracer.span('panel.select', indicator=indicator) as span:
+            panel = panel.select(countries, start_year, end_year)
+            span.set('countries', len(panel))
+        
+        # Prepare data for frontend; values are aligned with years, None for gaps
+        result = {}
+        if 'years' in fields:
+            result['years'] = panel.years.tolist()
+        
+        if fields & {'countries', 'values', 'stats'}:
+            with tracer.span('aggregate.countries', indicator=indicator, countries=len(panel)):
+                result['countries'] = {}
+                for country_code, name in zip(panel.codes, panel.names):
+                    info = self.country_info(country_code, name)
+                    result['countries'][country_code] = {
+                        'name': info['name'],
+                        'flag': info['flag'],
+                        'color': info['color'],
+                    }
+                if 'values' in fields:
+                    for country_code, values in zip(panel.codes, panel.series()):
+                        result['countries'][country_code]['values'] = values
+                if 'stats' in fields:
+                    latest, change, average = panel.latest(), panel.change(), panel.average()
+                    for i, country_code in enumerate(panel.codes):
+                        result['countries'][country_code].update({
+                            'latest': float(latest[i]),
+                            'change': float(change[i]),
+                            'average': float(average[i])
+                        })
+        
+        # Calculate rankings for latest year
+        if fields & {'rankings', 'india_position'}:
+            with tracer.span('aggregate.rankings', indicator=indicator) as span:
+                ranking = panel.ranking()
+                ranked = [panel.codes[i] for i in ranking['rows']]
+                if 'rankings' in fields:
+                    result['rankings'] = [
+                        {'country_code': panel.codes[i], 'country': panel.names[i], 'value': float(value)}
+                        for i, value in zip(ranking['rows'], ranking['values'])
+                    ]
+                
+                # Find India's position
+                if 'india_position' in fields:
+                    result['india_position'] = ranked.index('IND') + 1 if 'IND' in ranked else None
+                span.set('rows', len(ranked))
         
         return result
     
+    def get_relative_index(self, indicator: str, base_country: str = 'IND', mode: str = 'ratio',
+                           base_year: int = None, countries: List[str] = None) -> RelativeIndex:
+        """Relative values for the indicator's whole panel, cached per baseline and mode"""
+        panel = self.get_panel(indicator, countries or [base_country])
+        # A base year rebases every country to itself, so the base country doesn't matter
+        key = (indicator, id(panel), None if base_year is not None else base_country, base_year, mode)
+        with self._relative_lock:
+            index = self._relative.get(key)
+            if index is not None and index.panel is panel:
+                self._relative.move_to_end(key)
+                return index
+        
+        with tracer.span('relative.build', indicator=indicator, mode=mode, countries=len(panel)):
+            index = RelativeIndex(panel, mode, base_country, base_year)
+        with self._relative_lock:
+            self._relative[key] = index
+            while len(self._relative) > self.RELATIVE_CACHE_SIZE:
+                self._relative.popitem(last=False)
+        return index
+    
     def get_relative_comparison(self, indicator: str, base_country: str = 'IND', 
-                               compare_countries: List[str] = None) -> Dict:
-        """Get relative comparison (India as baseline = 100)"""
+                               compare_countries: List[str] = None, mode: str = 'ratio',
+                               base_year: int = None, start_year: int = 2010,
+                               end_year: int = 2024) -> Dict:
+        """Get relative comparison (India as baseline = 100)
+        
+        `mode` is 'ratio' (baseline = 100), 'difference' or 'log_difference'
+        (baseline = 0). With `base_year`, every country, the base included, is
+        rebased to its own value in that year instead.
+        """
         
         if compare_countries is None:
             compare_countries = ['CHN', 'USA', 'GBR', 'JPN', 'DEU', 'BRA']
+        if mode not in RELATIVE_MODES:
+            raise ValueError(f"Unknown mode '{mode}'; expected one of {', '.join(RELATIVE_MODES)}")
         
         all_countries = [base_country] + compare_countries
-        data = self.get_comparison_data(indicator, all_countries)
+        comparison = self.get_comparison_data(indicator, all_countries, start_year, end_year)
+        # The comparison is shared; copy only the entries that get relative values
+        data = dict(comparison, mode=mode, base_country=base_country, base_year=base_year,
+                    countries={code: dict(entry) for code, entry in comparison['countries'].items()})
         
-        if base_country not in data['countries']:
+        if base_year is None and base_country not in data['countries']:
+            return data
+        targets = all_countries if base_year is not None else compare_countries
+        present = [code for code in dict.fromkeys(targets) if code in data['countries']]
+        if not present:
             return data
         
-        india_values = data['countries'][base_country]['values']
+        # One slice of the cached matrix, aligned with data['years']; gaps are None
+        index = self.get_relative_index(indicator, base_country, mode, base_year, all_countries)
+        relative, valid = index.select(present, data['years'])
+        relative = np.where(valid, relative.round(2), None)
         
-        # Calculate relative values (India = 100)
-        for country_code in compare_countries:
-            if country_code in data['countries']:
-                country_values = data['countries'][country_code]['values']
-                relative_values = [
-                    round((cv / iv * 100), 2) if iv != 0 else 100
-                    for cv, iv in zip(country_values, india_values)
-                ]
-                data['countries'][country_code]['relative_values'] = relative_values
-                data['countries'][country_code]['latest_relative'] = relative_values[-1] if relative_values else 100
+        for code, row, row_valid in zip(present, relative.tolist(), valid):
+            data['countries'][code]['relative_values'] = row
+            observed = np.flatnonzero(row_valid)
+            data['countries'][code]['latest_relative'] = row[observed[-1]] if len(observed) else index.neutral
         
         return data
     
-    def get_multi_indicator_comparison(self, countries: List[str] = None) -> Dict:
-        """Get comparison across multiple indicators for radar chart"""
+    def get_multi_indicator_comparison(self, countries: List[str] = None,
+                                       start_year: int = 2010, end_year: int = 2024) -> Dict:
+        """Get comparison across multiple indicators for radar chart
+        
+        Each indicator is loaded once for all countries. The result may be shared
+        with concurrent callers; copy it before mutating.
+        """
         
         if countries is None:
             countries = ['IND', 'CHN', 'USA', 'GBR', 'JPN']
         
+        key = ('radar', tuple(countries), start_year, end_year)
+        return self._comparison_flight.do(key, self._build_multi_indicator_comparison,
+                                          countries, start_year, end_year)
+    
+    def _build_multi_indicator_comparison(self, countries: List[str],
+                                          start_year: int, end_year: int) -> Dict:
         indicators = ['gdp_growth', 'unemployment', 'inflation', 'trade_gdp']
-        result = {
-            'indicators': indicators,
-            'countries': {}
-        }
         
-        for country in countries:
-            country_data = []
-            for indicator in indicators:
-                data = self.get_comparison_data(indicator, [country])
-                if country in data['countries']:
-                    # Normalize values to 0-100 scale for radar chart
-                    value = data['countries'][country]['latest']
-                    # Simple normalization (can be improved)
-                    normalized = min(max((value / 10) * 100, 0), 100)
-                    country_data.append(round(normalized, 2))
-                else:
-                    country_data.append(0)
+        # Latest value per country, one column per indicator
+        matrix = np.full((len(countries), len(indicators)), np.nan)
+        for j, indicator in enumerate(indicators):
+            panel = self.get_panel(indicator, countries).select(countries, start_year, end_year)
+            with tracer.span('aggregate.latest', indicator=indicator, countries=len(panel)):
+                latest = dict(zip(panel.codes, panel.latest()))
+                matrix[:, j] = [latest.get(country, np.nan) for country in countries]
+        
+        with tracer.span('aggregate.radar', countries=len(countries)):
+            # Normalize values to 0-100 scale for radar chart; missing data plots as 0
+            normalized = np.nan_to_num(np.clip(matrix / 10 * 100, 0, 100).round(2), nan=0.0)
             
-            result['countries'][country] = {
-                'name': self.COMPARISON_COUNTRIES[country]['name'],
-                'flag': self.COMPARISON_COUNTRIES[country]['flag'],
-                'color': self.COMPARISON_COUNTRIES[country]['color'],
-                'values': country_data
+            result = {
+                'indicators': indicators,
+                'countries': {}
             }
+            for country, row in zip(countries, normalized.tolist()):
+                info = self.country_info(country)
+                result['countries'][country] = {
+                    'name': info['name'],
+                    'flag': info['flag'],
+                    'color': info['color'],
+                    'values': row
+                }
         
         return result
     
-    def export_all_comparisons(self):
-        """Export all comparison data to CSV files"""
+    def refresh_all(self, countries: List[str] = None, progress=None) -> Dict:
+        """Re-fetch every World Bank indicator for `countries` (default: all)"""
         
-        countries = list(self.COMPARISON_COUNTRIES.keys())
+        if countries is None:
+            countries = list(self.COMPARISON_COUNTRIES.keys())
         
-        for indicator_name, wb_code in self.WB_INDICATORS.items():
-            print(f"Generating comparison data for {indicator_name}...")
-            df = self.generate_comparison_csv(indicator_name, wb_code, countries)
-            
-            if not df.empty:
-                output_file = os.path.join(self.data_dir, f'comparison_{indicator_name}.csv')
-                df.to_csv(output_file, index=False)
-                print(f"Saved {output_file}")
-
+        refreshed = {}
+        for i, (name, wb_code) in enumerate(self.WB_INDICATORS.items()):
+            refreshed[name] = len(self.refresh(wb_code, countries))
+            if progress:
+                progress(i + 1, len(self.WB_INDICATORS),
+                         f"{name}: {refreshed[name]} of {len(countries)} countries")
+        return refreshed
+    
+    def export_all_comparisons(self, force: bool = False, progress=None) -> Dict:
+        """Export all comparison data to CSV files
+        
+        Indicators are exported in parallel and only those whose data changed
+        since the last export are rewritten.
+        """
+        
+        pipeline = ExportPipeline(
+            self, self.data_dir,
+            [{'name': name} for name in self.WB_INDICATORS],
+            file_pattern='comparison_{name}.csv',
+            manifest_file='comparison_export_manifest.json',
+        )
+        report = pipeline.run(force=force, progress=progress)
+        for name, status in report['indicators'].items():
+            print(f"{name}: {status}")
+        return report
 
 if __name__ == "__main__":
     # Test the comparison module
@@ -8,28 +8,52 @@ import numpy as np
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 
+from backend.dataset_store import DatasetStore
+from backend.singleflight import SingleFlight
+from backend.tracing import tracer
+
 
 class EconomicDataProcessor:
     """Process and clean economic indicator data"""
     
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
-        self.datasets = {}
+        self.store = DatasetStore()
+        self._correlation_flight = SingleFlight('correlation')
         self.load_all_data()
     
+    @property
+    def datasets(self):
+        """Read-only datasets of the snapshot pinned by this thread (or the latest)"""
+        return self.store.current().datasets
+    
     def load_all_data(self):
         """Load all CSV files into memory"""
-        self.datasets['gdp'] = self.load_gdp_data()
-        self.datasets['cpi'] = self.load_cpi_data()
-        self.datasets['gst'] = self.load_gst_data()
-        self.datasets['unemployment'] = self.load_unemployment_data()
-        self.datasets['forex'] = self.load_forex_data()
-        self.datasets['iip'] = self.load_iip_data()
-        self.datasets['repo_rate'] = self.load_repo_rate_data()
-        self.datasets['trade'] = self.load_trade_balance_data()
-        self.datasets['financial_inclusion'] = self.load_financial_inclusion_data()
-        self.datasets['digital_payment'] = self.load_digital_payment_data()
-        self.datasets['cli'] = self.load_cli_data()
+        loaders = {
+            'gdp': self.load_gdp_data,
+            'cpi': self.load_cpi_data,
+            'gst': self.load_gst_data,
+            'unemployment': self.load_unemployment_data,
+            'forex': self.load_forex_data,
+            'iip': self.load_iip_data,
+            'repo_rate': self.load_repo_rate_data,
+            'trade': self.load_trade_balance_data,
+            'financial_inclusion': self.load_financial_inclusion_data,
+            'digital_payment': self.load_digital_payment_data,
+            'cli': self.load_cli_data,
+        }
+        datasets = {}
+        with tracer.span('dataset.load_all'):
+            for name, loader in loaders.items():
+                with tracer.span('dataset.load', dataset=name) as span:
+                    datasets[name] = loader()
+                    span.set('rows', len(datasets[name]))
+        # Readers still holding the previous version keep it until they finish
+        self.store.publish(datasets)
+    
+    def reload(self):
+        """Re-read every CSV and publish the result as a new snapshot"""
+        self.load_all_data()
     
     def create_date_column(self, df: pd.DataFrame, year_col: str, period_col: str, 
                           period_type: str = 'month') -> pd.DataFrame:
@@ -141,7 +165,10 @@ class EconomicDataProcessor:
     
     def get_dataset(self, name: str) -> pd.DataFrame:
         """Get a specific dataset by name"""
-        return self.datasets.get(name, pd.DataFrame())
+        with tracer.span('dataset.lookup', dataset=name) as span:
+            df = self.datasets.get(name, pd.DataFrame())
+            span.set('rows', len(df))
+        return df
     
     def get_date_range(self, df: pd.DataFrame) -> Tuple[datetime, datetime]:
         """Get the date range of a dataset"""
@@ -155,11 +182,13 @@ class EconomicDataProcessor:
         if 'Date' not in df.columns:
             return df
         
-        result = df.copy()
-        if start_date:
-            result = result[result['Date'] >= start_date]
-        if end_date:
-            result = result[result['Date'] <= end_date]
+        with tracer.span('filter.date', rows_in=len(df)) as span:
+            result = df.copy()
+            if start_date:
+                result = result[result['Date'] >= start_date]
+            if end_date:
+                result = result[result['Date'] <= end_date]
+            span.set('rows', len(result))
         return result
     
     def calculate_statistics(self, df: pd.DataFrame, column: str) -> Dict:
@@ -167,61 +196,73 @@ class EconomicDataProcessor:
         if column not in df.columns:
             return {}
         
-        data = df[column].dropna()
-        if data.empty:
-            return {}
-        
-        stats = {
-            'mean': float(data.mean()),
-            'median': float(data.median()),
-            'std': float(data.std()),
-            'min': float(data.min()),
-            'max': float(data.max()),
-            'latest': float(data.iloc[-1]),
-            'count': int(data.count())
-        }
-        
-        # Calculate growth rate if possible
-        if len(data) > 1:
-            stats['growth_rate'] = float(((data.iloc[-1] - data.iloc[0]) / data.iloc[0]) * 100)
-            stats['change'] = float(data.iloc[-1] - data.iloc[0])
+        with tracer.span('statistics', column=column, rows=len(df)):
+            data = df[column].dropna()
+            if data.empty:
+                return {}
+            
+            stats = {
+                'mean': float(data.mean()),
+                'median': float(data.median()),
+                'std': float(data.std()),
+                'min': float(data.min()),
+                'max': float(data.max()),
+                'latest': float(data.iloc[-1]),
+                'count': int(data.count())
+            }
+            
+            # Calculate growth rate if possible
+            if len(data) > 1:
+                stats['growth_rate'] = float(((data.iloc[-1] - data.iloc[0]) / data.iloc[0]) * 100)
+                stats['change'] = float(data.iloc[-1] - data.iloc[0])
         
         return stats
     
     def get_correlation_matrix(self) -> pd.DataFrame:
         """Create correlation matrix between key indicators"""
+        with self.store.snapshot() as snapshot:
+            # Concurrent requests on the same version share a single computation
+            return self._correlation_flight.do(('correlation', snapshot.version),
+                                               self._build_correlation_matrix, snapshot.datasets)
+    
+    def _build_correlation_matrix(self, datasets) -> pd.DataFrame:
         # Merge datasets on Date
         merged = pd.DataFrame()
         
-        # GDP
-        gdp = self.datasets['gdp'][['Date', 'GDP_Growth_Percent']].copy()
-        merged = gdp if merged.empty else merged.merge(gdp, on='Date', how='outer')
-        
-        # CPI - aggregate by date
-        cpi = self.datasets['cpi'].groupby('Date')['Inflation_Rate'].mean().reset_index()
-        merged = merged.merge(cpi, on='Date', how='outer')
-        
-        # Unemployment - filter India only
-        unemp = self.datasets['unemployment'][
-            self.datasets['unemployment']['State'] == 'India'
-        ][['Date', 'Unemployment_Rate']].copy()
-        merged = merged.merge(unemp, on='Date', how='outer')
-        
-        # Forex
-        forex = self.datasets['forex'][['Date', 'Forex_Reserves_USD_Bn']].copy()
-        merged = merged.merge(forex, on='Date', how='outer')
-        
-        # IIP
-        iip = self.datasets['iip'][['Date', 'IIP_YOY_Growth']].copy()
-        merged = merged.merge(iip, on='Date', how='outer')
-        
-        # Repo Rate
-        repo = self.datasets['repo_rate'][['Date', 'Repo_Rate_Percent']].copy()
-        merged = merged.merge(repo, on='Date', how='outer')
+        with tracer.span('aggregate.merge') as span:
+            # GDP
+            gdp = datasets['gdp'][['Date', 'GDP_Growth_Percent']].copy()
+            merged = gdp if merged.empty else merged.merge(gdp, on='Date', how='outer')
+            
+            # CPI - aggregate by date
+            with tracer.span('aggregate.groupby', dataset='cpi') as groupby_span:
+                cpi = datasets['cpi'].groupby('Date')['Inflation_Rate'].mean().reset_index()
+                groupby_span.set('rows', len(cpi))
+            merged = merged.merge(cpi, on='Date', how='outer')
+            
+            # Unemployment - filter India only
+            unemp = datasets['unemployment'][
+                datasets['unemployment']['State'] == 'India'
+            ][['Date', 'Unemployment_Rate']].copy()
+            merged = merged.merge(unemp, on='Date', how='outer')
+            
+            # Forex
+            forex = datasets['forex'][['Date', 'Forex_Reserves_USD_Bn']].copy()
+            merged = merged.merge(forex, on='Date', how='outer')
+            
+            # IIP
+            iip = datasets['iip'][['Date', 'IIP_YOY_Growth']].copy()
+            merged = merged.merge(iip, on='Date', how='outer')
+            
+            # Repo Rate
+            repo = datasets['repo_rate'][['Date', 'Repo_Rate_Percent']].copy()
+            merged = merged.merge(repo, on='Date', how='outer')
+            span.set('rows', len(merged))
         
         # Calculate correlation
-        merged = merged.drop('Date', axis=1)
-        correlation = merged.corr()
+        with tracer.span('statistics.correlation', rows=len(merged)):
+            merged = merged.drop('Date', axis=1)
+            correlation = merged.corr()
         
         return correlation
     
@@ -0,0 +1,167 @@
+"""
+Dataset Store for IndianPulse
+Thread-safe, versioned datasets with read-copy-update snapshot isolation
+"""
+
+import threading
+from collections import abc
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, Optional
+
+import pandas as pd
+
+
+class Snapshot:
+    """An immutable, versioned view of every dataset in a store.
+
+    The mapping is read-only and writers never modify published frames, so a
+    reader holding a snapshot sees one consistent version for its whole request.
+    """
+
+    def __init__(self, version: int, datasets: Mapping[str, pd.DataFrame]):
+        self.version = version
+        self.datasets = MappingProxyType(dict(datasets))
+        self.readers = 0
+
+
+class DatasetStore:
+    """Readers pin the current snapshot; writers publish a new one atomically.
+
+    Old versions stay alive while any reader still holds them and are dropped
+    as soon as the last one releases.
+    """
+
+    def __init__(self, datasets: Optional[Mapping[str, pd.DataFrame]] = None):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._current = Snapshot(0, datasets or {})
+        self._live: Dict[int, Snapshot] = {0: self._current}
+        self.reclaimed = 0
+
+    def _pinned(self) -> list:
+        pinned = getattr(self._local, 'pinned', None)
+        if pinned is None:
+            pinned = self._local.pinned = []
+        return pinned
+
+    def current(self) -> Snapshot:
+        """The snapshot pinned by this thread, or the latest published one"""
+        pinned = self._pinned()
+        return pinned[-1] if pinned else self._current
+
+    @property
+    def version(self) -> int:
+        return self.current().version
+
+    def pin(self) -> Snapshot:
+        """Hold the latest snapshot for this thread until `release`"""
+        with self._lock:
+            snapshot = self._current
+            snapshot.readers += 1
+        self._pinned().append(snapshot)
+        return snapshot
+
+    def release(self, snapshot: Snapshot):
+        pinned = self._pinned()
+        for i in range(len(pinned) - 1, -1, -1):
+            if pinned[i] is snapshot:
+                del pinned[i]
+                break
+        with self._lock:
+            snapshot.readers -= 1
+            if snapshot.readers == 0 and snapshot is not self._current:
+                self._reclaim(snapshot)
+
+    @contextmanager
+    def snapshot(self) -> Iterator[Snapshot]:
+        """Pin one consistent version for the duration of the block"""
+        snapshot = self.pin()
+        try:
+            yield snapshot
+        finally:
+            self.release(snapshot)
+
+    def _reclaim(self, snapshot: Snapshot):
+        if self._live.pop(snapshot.version, None) is not None:
+            self.reclaimed += 1
+
+    def _publish_locked(self, datasets: Mapping[str, pd.DataFrame]) -> Snapshot:
+        previous = self._current
+        snapshot = Snapshot(previous.version + 1, datasets)
+        self._current = snapshot
+        self._live[snapshot.version] = snapshot
+        if previous.readers == 0:
+            self._reclaim(previous)
+        return snapshot
+
+    def publish(self, datasets: Mapping[str, pd.DataFrame]) -> Snapshot:
+        """Replace every dataset with a new version"""
+        with self._lock:
+            return self._publish_locked(datasets)
+
+    def update(self, name: str, df: pd.DataFrame) -> Snapshot:
+        """Publish a new version with one dataset added or replaced"""
+        with self._lock:
+            datasets = dict(self._current.datasets)
+            datasets[name] = df
+            return self._publish_locked(datasets)
+
+    def update_many(self, changes: Mapping[str, pd.DataFrame]) -> Snapshot:
+        """Publish a new version with several datasets added or replaced at once"""
+        with self._lock:
+            datasets = dict(self._current.datasets)
+            datasets.update(changes)
+            return self._publish_locked(datasets)
+
+    def remove(self, name: str) -> Snapshot:
+        """Publish a new version without `name`"""
+        with self._lock:
+            datasets = dict(self._current.datasets)
+            datasets.pop(name, None)
+            return self._publish_locked(datasets)
+
+    def view(self) -> 'DatasetView':
+        return DatasetView(self)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'version': self._current.version,
+                'datasets': len(self._current.datasets),
+                'live_versions': len(self._live),
+                'pinned_readers': sum(s.readers for s in self._live.values()),
+                'reclaimed_versions': self.reclaimed,
+            }
+
+
+class DatasetView(abc.Mapping):
+    """Read-only mapping that always resolves through the caller's snapshot"""
+
+    def __init__(self, store: DatasetStore):
+        self._store = store
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        return self._store.current().datasets[name]
+
+    def __iter__(self):
+        return iter(self._store.current().datasets)
+
+    def __len__(self) -> int:
+        return len(self._store.current().datasets)
+
+
+def pin_per_request(app, *stores: DatasetStore):
+    """Pin a snapshot of each store for every Flask request"""
+    from flask import g
+
+    @app.before_request
+    def _pin_snapshots():
+        g._pinned_snapshots = [(store, store.pin()) for store in stores]
+
+    @app.teardown_request
+    def _release_snapshots(exc):
+        for store, snapshot in g.pop('_pinned_snapshots', []):
+            store.release(snapshot)
+
+    return app
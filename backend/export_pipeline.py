@@ -0,0 +1,291 @@
+"""
+Comparison Export Pipeline for IndianPulse
+Parallel, incremental export of comparison CSVs with a content-hash manifest
+
+Each indicator is exported on a worker thread. An indicator whose inputs
+(source, countries, years and stored data version) match the manifest is
+skipped without regenerating it; one whose regenerated rows hash the same as
+last time is not rewritten. The combined file is streamed from the
+per-indicator files and the India summary only recomputes changed rows.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.file_lock import FileLock, LockStats
+from backend.panel import CountryPanel
+from backend.tracing import tracer
+
+MANIFEST_VERSION = 1
+
+
+def content_hash(df: pd.DataFrame) -> str:
+    """Stable hash of a frame's rows and columns"""
+    digest = hashlib.sha256(','.join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, write):
+    """Write through a temp file so readers never see a half-written file
+
+    The temp name is unique per process and thread, so concurrent writers of
+    the same file never write into or rename each other's temp file.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class ExportPipeline:
+    """Export comparison indicators to CSV, redoing only what changed.
+
+    `indicators` are dicts with `name` and optionally `display_name`, `unit`
+    and `source` ('data' uses World Bank data with the synthetic fallback,
+    'synthetic' always generates). With `wb_code`, the summary row comes from
+    the comparator's comparison data for that indicator rather than from the
+    exported rows. `file_pattern` names the per-indicator files.
+    """
+
+    def __init__(self, comparator, output_dir: str, indicators: List[Dict],
+                 countries: Optional[List[str]] = None, start_year: int = 2010,
+                 end_year: int = 2024, file_pattern: str = '{name}_comparison.csv',
+                 combined_file: Optional[str] = None, summary_file: Optional[str] = None,
+                 manifest_file: str = 'export_manifest.json', max_workers: int = None):
+        self.comparator = comparator
+        self.output_dir = output_dir
+        self.indicators = indicators
+        self.countries = countries or list(comparator.COMPARISON_COUNTRIES.keys())
+        self.start_year = start_year
+        self.end_year = end_year
+        self.file_pattern = file_pattern
+        self.combined_file = combined_file
+        self.summary_file = summary_file
+        self.manifest_path = os.path.join(output_dir, manifest_file)
+        self.max_workers = max_workers or min(len(indicators), os.cpu_count() or 4) or 1
+        self.lock_stats = LockStats()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def lock(self, filename: str) -> FileLock:
+        """Lock shared with every process exporting `filename` into this directory"""
+        return FileLock(os.path.join(self.output_dir, f".{filename}.lock"), stats=self.lock_stats)
+
+    def load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'version': MANIFEST_VERSION, 'indicators': {}}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {'version': MANIFEST_VERSION, 'indicators': {}}
+        return manifest
+
+    def _save_manifest(self, manifest: Dict):
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+        _write_atomic(self.manifest_path, write)
+
+    def _path(self, config: Dict) -> str:
+        return os.path.join(self.output_dir, self.file_pattern.format(name=config['name']))
+
+    def fingerprint(self, config: Dict) -> str:
+        """Everything an indicator's export depends on, hashed"""
+        wb_code = self.comparator.WB_INDICATORS.get(config['name'])
+        source = config.get('source', 'data')
+        inputs = {
+            'name': config['name'],
+            'display_name': config.get('display_name'),
+            'unit': config.get('unit'),
+            'source': source,
+            'countries': self.countries,
+            'years': [self.start_year, self.end_year],
+            # Synthetic output is a pure function of the above
+            'store': (self.comparator.store.signature(wb_code)
+                      if source == 'data' and wb_code else None),
+            'summary': self._summary_signature(config),
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=list).encode()).hexdigest()
+
+    def _generate(self, config: Dict) -> pd.DataFrame:
+        name = config['name']
+        wb_code = self.comparator.WB_INDICATORS.get(name)
+        if config.get('source', 'data') == 'data' and wb_code:
+            return self.comparator.generate_comparison_csv(name, wb_code, self.countries,
+                                                           self.start_year, self.end_year)
+        return self.comparator._generate_synthetic_comparison_data(name, self.countries,
+                                                                   self.start_year, self.end_year)
+
+    def _summary_signature(self, config: Dict):
+        """Version of the stored data a `wb_code` summary is read from"""
+        wb_code = self.comparator.WB_INDICATORS.get(config.get('wb_code'))
+        return self.comparator.store.signature(wb_code) if wb_code else None
+
+    def summarize(self, config: Dict, df: pd.DataFrame, country: str = 'IND') -> Optional[Dict]:
+        """One summary row for `country`, from the comparison data or the exported rows"""
+        if config.get('wb_code'):
+            data = self.comparator.get_comparison_data(config['wb_code'], self.countries,
+                                                       self.start_year, self.end_year,
+                                                       fields=['stats', 'rankings'])
+            info = data['countries'].get(country)
+            if info is None:
+                return None
+            ranked = [row['country_code'] for row in data['rankings']]
+            return {
+                'indicator': config.get('display_name', config['name']),
+                'unit': config.get('unit', ''),
+                'latest_value': info['latest'],
+                'change': info['change'],
+                'average': info['average'],
+                'position': ranked.index(country) + 1 if country in ranked else 'N/A',
+            }
+
+        panel = CountryPanel.from_frame(df)
+        row = panel.row(country)
+        if row is None or not panel.mask[row].any():
+            return None
+        ranking = panel.ranking()
+        position = np.flatnonzero(ranking['rows'] == row)
+        return {
+            'indicator': config.get('display_name', config['name']),
+            'unit': config.get('unit', ''),
+            'latest_value': float(panel.latest()[row]),
+            'change': float(panel.change()[row]),
+            'average': float(panel.average()[row]),
+            'position': int(position[0]) + 1 if len(position) else 'N/A',
+        }
+
+    def _export_one(self, config: Dict, previous: Optional[Dict], force: bool) -> Dict:
+        # Another process exporting the same file finishes (and renames) first
+        with self.lock(os.path.basename(self._path(config))):
+            return self._export_locked(config, previous, force)
+
+    def _export_locked(self, config: Dict, previous: Optional[Dict], force: bool) -> Dict:
+        path = self._path(config)
+        fingerprint = self.fingerprint(config)
+        if (not force and previous and previous.get('fingerprint') == fingerprint
+                and os.path.exists(path)):
+            return dict(previous, status='unchanged')
+
+        with tracer.span('export.indicator', indicator=config['name']) as span:
+            df = self._generate(config)
+            if df.empty:
+                span.set('status', 'empty')
+                return {'status': 'empty', 'fingerprint': fingerprint}
+            digest = content_hash(df)
+            status = 'unchanged'
+            if force or not previous or previous.get('hash') != digest or not os.path.exists(path):
+                _write_atomic(path, lambda tmp: df.to_csv(tmp, index=False))
+                status = 'written'
+            span.set('status', status)
+            span.set('rows', len(df))
+
+        return {
+            'status': status,
+            'fingerprint': fingerprint,
+            'hash': digest,
+            'file': os.path.basename(path),
+            'rows': len(df),
+            'summary': self.summarize(config, df),
+        }
+
+    def _write_combined(self, manifest: Dict):
+        """Concatenate the per-indicator files line by line, adding name and unit"""
+        path = os.path.join(self.output_dir, self.combined_file)
+
+        def write(tmp):
+            rows = 0
+            with open(tmp, 'w', newline='') as out:
+                writer = csv.writer(out, lineterminator='\n')
+                header_written = False
+                for config in self.indicators:
+                    entry = manifest['indicators'].get(config['name'], {})
+                    if not entry.get('file'):
+                        continue
+                    suffix = [config.get('display_name', config['name']), config.get('unit', '')]
+                    with open(os.path.join(self.output_dir, entry['file']), newline='') as f:
+                        reader = csv.reader(f)
+                        header = next(reader, None)
+                        if header is None:
+                            continue
+                        if not header_written:
+                            writer.writerow(header + ['indicator_name', 'unit'])
+                            header_written = True
+                        for line in reader:
+                            writer.writerow(line + suffix)
+                            rows += 1
+            manifest['combined_rows'] = rows
+
+        with tracer.span('export.combined'):
+            _write_atomic(path, write)
+
+    def summary_frame(self, manifest: Dict) -> Optional[pd.DataFrame]:
+        rows = [manifest['indicators'][c['name']]['summary'] for c in self.indicators
+                if (manifest['indicators'].get(c['name']) or {}).get('summary')]
+        return pd.DataFrame(rows) if rows else None
+
+    def run(self, force: bool = False, progress: Optional[Callable] = None) -> Dict:
+        """Export every indicator; returns {'indicators': {name: status}, ...}
+
+        `progress(done, total, message)` is called as each indicator finishes.
+        """
+        started = time.perf_counter()
+        manifest = self.load_manifest()
+        previous = manifest['indicators']
+
+        with tracer.span('export.run', indicators=len(self.indicators)):
+            results = {}
+            with ThreadPoolExecutor(self.max_workers, thread_name_prefix='export') as pool:
+                futures = {pool.submit(self._export_one, config, previous.get(config['name']),
+                                       force): config['name'] for config in self.indicators}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print(f"Export of {name} failed: {e}")
+                        results[name] = dict(previous.get(name, {}), status='error', error=str(e))
+                    if progress:
+                        progress(len(results), len(futures), f"{name}: {results[name]['status']}")
+            # Report in configuration order
+            results = {config['name']: results[config['name']] for config in self.indicators}
+
+            changed = [name for name, r in results.items() if r['status'] == 'written']
+            # Combined outputs also go stale when indicators are added or removed
+            rebuild = bool(changed) or force or set(previous) != set(results)
+
+            # Reload, update and save the manifest (and the files built from it) under one
+            # lock, so exports finishing in other processes don't lose each other's entries
+            with self.lock(os.path.basename(self.manifest_path)):
+                latest = self.load_manifest()['indicators']
+                manifest['indicators'] = {
+                    name: (latest[name] if r['status'] == 'error' and name in latest else
+                           {k: v for k, v in r.items() if k not in ('status', 'error')})
+                    for name, r in results.items()
+                }
+
+                combined_path = self.combined_file and os.path.join(self.output_dir, self.combined_file)
+                if combined_path and (rebuild or not os.path.exists(combined_path)):
+                    self._write_combined(manifest)
+                # Summary rows are kept in the manifest, so only changed indicators were recomputed
+                summary = self.summary_frame(manifest)
+                summary_path = self.summary_file and os.path.join(self.output_dir, self.summary_file)
+                if summary_path and summary is not None and (rebuild or not os.path.exists(summary_path)):
+                    _write_atomic(summary_path, lambda tmp: summary.to_csv(tmp, index=False))
+                self._save_manifest(manifest)
+
+        return {
+            'indicators': {name: r['status'] for name, r in results.items()},
+            'changed': changed,
+            'summary': summary,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
@@ -0,0 +1,111 @@
+"""
+File Locks for IndianPulse
+Exclusive advisory locks shared by every process on the host
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class LockStats:
+    """Counters shared by the locks of one owner, e.g. a store"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.contended = 0
+        self.timed_out = 0
+
+    def record(self, acquired: bool, waited: bool):
+        with self._lock:
+            self.acquired += acquired
+            self.contended += waited
+            self.timed_out += not acquired
+
+    def to_dict(self) -> Dict:
+        return {'acquired': self.acquired, 'contended': self.contended,
+                'timed_out': self.timed_out}
+
+
+class FileLock:
+    """Exclusive lock on `path`, usable as a context manager.
+
+    Each acquire opens its own descriptor, so the lock excludes other threads
+    of this process as well as other processes. With a `timeout`, `acquire`
+    gives up and returns False; the context manager then runs unlocked, which
+    `acquired` reports. The lock file itself is left in place.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None, poll: float = 0.05,
+                 stats: Optional[LockStats] = None):
+        self.path = path
+        self.timeout = timeout
+        self.poll = poll
+        self.stats = stats
+        self.acquired = False
+        self.waited = False
+        self._fd = None
+
+    def acquire(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        self.waited = False
+        while not _try_lock(fd):
+            self.waited = True
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                self._record(False)
+                return False
+            time.sleep(self.poll)
+        self._fd = fd
+        self.acquired = True
+        self._record(True)
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            _unlock(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self.acquired = False
+
+    def _record(self, acquired: bool):
+        if self.stats is not None:
+            self.stats.record(acquired, self.waited)
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
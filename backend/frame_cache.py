@@ -0,0 +1,104 @@
+"""
+Frame Cache for IndianPulse
+Bounded, thread-safe LRU of parsed DataFrames with size accounting
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional
+
+import pandas as pd
+
+
+def frame_size(df: pd.DataFrame) -> int:
+    """Bytes held by a frame, including object/string columns"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class FrameLRU:
+    """Least-recently-used cache of frames bounded by total size.
+
+    Each entry remembers the signature of the source it was read from. A lookup
+    with a different signature (the file on disk changed) counts as a miss and
+    drops the stale entry. Cached frames are shared, so treat them as read-only.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, signature=None) -> Optional[pd.DataFrame]:
+        return self.get_any([key], signature)
+
+    def get_any(self, keys: Iterable[Hashable], signature=None) -> Optional[pd.DataFrame]:
+        """The first of `keys` that is cached; one hit or miss for the whole lookup"""
+        with self._lock:
+            for key in keys:
+                df = self._peek(key, signature)
+                if df is not None:
+                    self.hits += 1
+                    return df
+            self.misses += 1
+            return None
+
+    def _peek(self, key: Hashable, signature) -> Optional[pd.DataFrame]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        df, size, cached_signature = entry
+        if cached_signature != signature:
+            self._drop(key)
+            self.invalidations += 1
+            return None
+        self._entries.move_to_end(key)
+        return df
+
+    def put(self, key: Hashable, df: pd.DataFrame, signature=None):
+        size = frame_size(df)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (df, size, signature)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def invalidate(self, predicate=None) -> int:
+        """Drop every entry, or those whose key matches `predicate`"""
+        with self._lock:
+            keys = [k for k in self._entries if predicate is None or predicate(k)]
+            for key in keys:
+                self._drop(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,233 @@
+"""
+Background Jobs for IndianPulse
+In-process job queue for long-running operations with progress reporting
+"""
+
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional
+
+from backend.file_lock import FileLock
+from backend.tracing import tracer
+
+
+class Job:
+    """One submitted operation; `to_dict` is what `/api/jobs/<id>` returns"""
+
+    def __init__(self, key: Hashable, name: str, save: Optional[Callable] = None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = name
+        self.status = 'queued'
+        self.done = 0
+        self.total = None
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._finished = threading.Event()
+        # Called with the job whenever its status or progress changes
+        self._save = save
+
+    def _changed(self):
+        if self._save is not None:
+            self._save(self)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ('queued', 'running')
+
+    def skip(self, message: str):
+        """Finish without running, e.g. when another process already runs the same work"""
+        self.status = 'skipped'
+        self.message = message
+        self.finished_at = time.time()
+        self._changed()
+        self._finished.set()
+
+    def progress(self, done: int, total: Optional[int] = None, message: str = ''):
+        """Called by the running operation to report how far it got"""
+        self.done = done
+        if total is not None:
+            self.total = total
+        self.message = message
+        self._changed()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._finished.wait(timeout)
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'progress': {
+                'done': self.done,
+                'total': self.total,
+                'fraction': round(self.done / self.total, 4) if self.total else None,
+                'message': self.message,
+            },
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobQueue:
+    """Run submitted operations on a bounded worker pool.
+
+    Submitting a key that already has a queued or running job returns that
+    job instead of starting another. That only covers this process; with a
+    `lock` file, a job whose lock is already held, here or by another
+    process, is skipped instead of run. Finished jobs are kept (up to
+    `keep_finished`) so their status can still be polled.
+
+    With a `state_dir`, every job's status is also written there as
+    `<id>.json`, so any worker process can answer a poll for it.
+    """
+
+    def __init__(self, max_workers: int = None, keep_finished: int = 100,
+                 state_dir: Optional[str] = None):
+        self.max_workers = max_workers or int(os.environ.get('JOB_WORKERS', 2))
+        self.keep_finished = keep_finished
+        self.state_dir = state_dir
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._reset()
+        # Worker threads don't survive fork; each worker process gets its own queue
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._active: Dict[Hashable, Job] = {}
+        # lock path -> the job in this process holding it
+        self._held: Dict[str, Job] = {}
+        self.deduplicated = 0
+
+    def _state_path(self, job_id: str) -> Optional[str]:
+        # Ids are uuid hex; anything else would be a path outside the directory
+        if not self.state_dir or not job_id.isalnum():
+            return None
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _save(self, job: Job):
+        path = self._state_path(job.id)
+        if path is None:
+            return
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(job.to_dict(), f, default=str)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Could not save job {job.id}: {e}")
+
+    def submit(self, key: Hashable, fn: Callable, *args, name: str = None,
+               lock: Optional[str] = None, **kwargs) -> Job:
+        """Queue `fn(*args, progress=job.progress, **kwargs)` unless `key` is already active
+
+        With `lock`, the job holds that file lock from submission until it
+        finishes; if another process holds it, the job is returned skipped.
+        """
+        with self._lock:
+            existing = self._active.get(key)
+            if existing is not None:
+                self.deduplicated += 1
+                return existing
+            job = Job(key, name or getattr(fn, '__name__', 'job'), save=self._save)
+            self._jobs[job.id] = job
+            file_lock = None
+            if lock is not None:
+                holder = self._held.get(lock)
+                if holder is None:
+                    file_lock = FileLock(lock, timeout=0)
+                if holder is not None or not file_lock.acquire():
+                    self.deduplicated += 1
+                    job.skip(f'already running in this process as job {holder.id}' if holder
+                             else 'already running in another process')
+                    self._prune()
+                    return job
+                self._held[lock] = job
+            self._active[key] = job
+            job._changed()
+            self._prune()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='jobs')
+            executor = self._executor
+        executor.submit(self._run, job, fn, args, kwargs, file_lock)
+        return job
+
+    def _run(self, job: Job, fn: Callable, args, kwargs, file_lock: Optional[FileLock] = None):
+        job.status = 'running'
+        job.started_at = time.time()
+        job._changed()
+        try:
+            with tracer.span('job.run', job=job.name):
+                job.result = fn(*args, progress=job.progress, **kwargs)
+            job.status = 'succeeded'
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+                if file_lock is not None:
+                    del self._held[file_lock.path]
+                    file_lock.release()
+            job._changed()
+            job._finished.set()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self._jobs[job_id]
+            path = self._state_path(job_id)
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """`to_dict` of a job from this process, or as last saved by any process"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        path = self._state_path(job_id)
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            return {
+                'workers': self.max_workers,
+                'queued': statuses.count('queued'),
+                'running': statuses.count('running'),
+                'succeeded': statuses.count('succeeded'),
+                'failed': statuses.count('failed'),
+                'skipped': statuses.count('skipped'),
+                'deduplicated': self.deduplicated,
+            }
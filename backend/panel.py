@@ -0,0 +1,125 @@
+"""
+Country Panel for IndianPulse
+Dense country x year matrices for vectorized comparison statistics
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class CountryPanel:
+    """One indicator as a dense country x year matrix.
+
+    `values[i, j]` is country i in `years[j]`, and `mask` marks the cells that
+    hold an observation (gaps are NaN). Columns are consecutive years, so every
+    per-country statistic is a row-wise array operation with exact year alignment.
+    """
+
+    def __init__(self, codes: List[str], names: List[str], years: np.ndarray,
+                 values: np.ndarray, mask: np.ndarray):
+        self.codes = list(codes)
+        self.names = list(names)
+        self.years = years
+        self.values = values
+        self.mask = mask
+        self._rows = {code: i for i, code in enumerate(self.codes)}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'CountryPanel':
+        """Pivot long-format rows (country_code, country, year, value); later rows win"""
+        if df.empty:
+            return cls([], [], np.array([], dtype=int), np.empty((0, 0)), np.empty((0, 0), dtype=bool))
+
+        row_idx, codes = pd.factorize(df['country_code'])
+        names = pd.Series(df['country'].to_numpy()).groupby(row_idx).last().tolist()
+        years = df['year'].to_numpy(dtype=int)
+        first_year = years.min()
+        col_idx = years - first_year
+
+        shape = (len(codes), years.max() - first_year + 1)
+        values = np.full(shape, np.nan)
+        mask = np.zeros(shape, dtype=bool)
+        values[row_idx, col_idx] = df['value'].to_numpy(dtype=float)
+        mask[row_idx, col_idx] = True
+        # A NaN observation is still a gap
+        mask &= ~np.isnan(values)
+        return cls(list(codes), names, np.arange(first_year, first_year + shape[1]), values, mask)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def empty(self) -> bool:
+        return not self.mask.any()
+
+    def row(self, code: str) -> Optional[int]:
+        return self._rows.get(code)
+
+    def select(self, countries: Optional[List[str]] = None, start_year: Optional[int] = None,
+               end_year: Optional[int] = None, drop_empty: bool = True) -> 'CountryPanel':
+        """Rows in request order and the requested year columns
+
+        With `drop_empty`, countries without data and years no country
+        reports are left out.
+        """
+        rows = (np.arange(len(self.codes)) if countries is None
+                else np.array([self._rows[c] for c in countries if c in self._rows], dtype=int))
+        # Years are consecutive, so the range is one column slice and only it is copied
+        lo = 0 if start_year is None else int(np.searchsorted(self.years, start_year, 'left'))
+        hi = len(self.years) if end_year is None else int(np.searchsorted(self.years, end_year, 'right'))
+        hi = max(hi, lo)
+
+        values = self.values[rows, lo:hi]
+        mask = self.mask[rows, lo:hi]
+        years = self.years[lo:hi]
+        if drop_empty:
+            keep_rows, keep_cols = mask.any(axis=1), mask.any(axis=0)
+            rows = rows[keep_rows]
+            values, mask, years = values[keep_rows][:, keep_cols], mask[keep_rows][:, keep_cols], years[keep_cols]
+        return CountryPanel([self.codes[i] for i in rows], [self.names[i] for i in rows],
+                            years, values, mask)
+
+    def counts(self) -> np.ndarray:
+        return self.mask.sum(axis=1)
+
+    def _edge(self, last: bool) -> np.ndarray:
+        """Value at each country's first or last observed year (NaN without data)"""
+        if not len(self.years):
+            return np.full(len(self.codes), np.nan)
+        if last:
+            idx = self.mask.shape[1] - 1 - self.mask[:, ::-1].argmax(axis=1)
+        else:
+            idx = self.mask.argmax(axis=1)
+        edge = self.values[np.arange(len(self.codes)), idx]
+        return np.where(self.mask.any(axis=1), edge, np.nan)
+
+    def latest(self) -> np.ndarray:
+        return self._edge(last=True)
+
+    def first(self) -> np.ndarray:
+        return self._edge(last=False)
+
+    def change(self) -> np.ndarray:
+        """Latest minus first observation; 0 with fewer than two observations"""
+        return np.where(self.counts() > 1, self.latest() - self.first(), 0.0)
+
+    def average(self) -> np.ndarray:
+        totals = np.where(self.mask, self.values, 0.0).sum(axis=1)
+        counts = self.counts()
+        return np.divide(totals, counts, out=np.full(len(self.codes), np.nan), where=counts > 0)
+
+    def series(self, values: Optional[np.ndarray] = None) -> List[List]:
+        """Per-country lists aligned with `years`, None for gaps"""
+        values = self.values if values is None else values
+        return np.where(self.mask, values, None).tolist()
+
+    def ranking(self) -> Dict:
+        """Countries reporting the last year, highest value first"""
+        if not len(self.years):
+            return {'rows': np.array([], dtype=int), 'values': np.array([])}
+        reporting = np.flatnonzero(self.mask[:, -1])
+        values = self.values[reporting, -1]
+        order = np.argsort(-values, kind='stable')
+        return {'rows': reporting[order], 'values': values[order]}
@@ -0,0 +1,150 @@
+"""
+Peer Groups for IndianPulse
+Percentile, z-score and rank of every country within peer groups, for every year
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.panel import CountryPanel
+
+
+def members_before(queries: np.ndarray, members: np.ndarray, inclusive: bool) -> np.ndarray:
+    """For every query cell, how many members of the same column sort before it
+
+    Counts members strictly below the query, or with `inclusive`, at or
+    below it. Queries and members are stacked and sorted down every column
+    in one stable argsort; which block comes first decides where equal
+    values fall.
+    """
+    n, k = len(queries), len(members)
+    stacked = np.concatenate([members, queries] if inclusive else [queries, members])
+    is_member = np.zeros(n + k, dtype=int)
+    if inclusive:
+        is_member[:k] = 1
+    else:
+        is_member[n:] = 1
+    order = np.argsort(stacked, axis=0, kind='stable')
+    flags = is_member[order]
+    counts = np.empty_like(flags)
+    np.put_along_axis(counts, order, np.cumsum(flags, axis=0) - flags, axis=0)
+    return counts[k:] if inclusive else counts[:n]
+
+
+class PeerStanding:
+    """Every country's standing against one group, as country x year matrices.
+
+    A country is always compared with the *other* members that reported: a
+    member leaves itself out and a non-member is placed among all of them.
+    Percentile, rank and z-score (with `peer_mean` and `peer_std`, population
+    spread) all use those same peers. NaN (or 0 for ranks) where the country
+    or every peer didn't report.
+    """
+
+    def __init__(self, panel: CountryPanel, members: List[str]):
+        rows = [panel.row(code) for code in dict.fromkeys(members)]
+        self.rows = np.array([row for row in rows if row is not None], dtype=int)
+        n_countries, n_years = panel.values.shape
+        # Gaps become +inf, so they sort after every observation and never count as below
+        peers = np.where(panel.mask[self.rows], panel.values[self.rows], np.inf)
+        values = np.where(panel.mask, panel.values, np.nan)
+
+        member = np.zeros(n_countries, dtype=bool)
+        member[self.rows] = True
+        itself = member[:, None] & panel.mask
+        self.count = panel.mask[self.rows].sum(axis=0)
+        others = self.count[None, :] - itself
+        valid = panel.mask & (others > 0)
+
+        # Whole-group statistics, from the sorted reporting members
+        ordered = np.sort(peers, axis=0)
+        observed = np.isfinite(ordered)
+        totals = np.where(observed, ordered, 0.0).sum(axis=0)
+        self.mean = np.divide(totals, self.count, out=np.full(n_years, np.nan), where=self.count > 0)
+        spread = ((np.where(observed, ordered - self.mean, 0.0)) ** 2).sum(axis=0)
+        self.median = np.full(n_years, np.nan)
+        if len(ordered):
+            middle = np.stack([(self.count - 1) // 2, self.count // 2]).clip(0)
+            self.median[self.count > 0] = np.take_along_axis(ordered, middle, axis=0).mean(axis=0)[self.count > 0]
+
+        # Peer statistics: a reporting member's own value is removed from the group's
+        n_peers = np.where(valid, others, 1)
+        self.peer_mean = np.where(itself, (totals - np.where(itself, values, 0.0)) / n_peers, self.mean)
+        removed = np.where(itself, (values - self.mean) ** 2 * self.count / n_peers, 0.0)
+        self.peer_std = np.sqrt(np.clip(spread - removed, 0.0, None) / n_peers)
+        self.peer_mean[~valid] = np.nan
+        self.peer_std[~valid] = np.nan
+
+        below = members_before(values, peers, inclusive=False)
+        at_or_below = members_before(values, peers, inclusive=True)
+        ties = at_or_below - below - itself
+
+        self.percentile = np.full((n_countries, n_years), np.nan)
+        np.divide((below + 0.5 * ties) * 100, others, out=self.percentile, where=valid)
+        self.rank = np.where(valid, self.count[None, :] - at_or_below + 1, 0)
+        self.out_of = np.where(valid, others + 1, 0)
+        self.z_score = np.full((n_countries, n_years), np.nan)
+        np.divide(values - self.peer_mean, self.peer_std, out=self.z_score,
+                  where=valid & (self.peer_std > 0))
+        self.member = member
+
+
+class PeerIndex:
+    """Standings of every country in every group for one indicator's panel.
+
+    Built in one pass per group when the panel changes; lookups are array
+    indexing.
+    """
+
+    def __init__(self, panel: CountryPanel, groups: Dict[str, List[str]]):
+        self.panel = panel
+        self.groups = {name: PeerStanding(panel, members) for name, members in groups.items()}
+
+    def latest_year(self, country: str, end_year: Optional[int] = None) -> Optional[int]:
+        row = self.panel.row(country)
+        if row is None:
+            return None
+        reported = self.panel.mask[row].copy()
+        if end_year is not None:
+            reported &= self.panel.years <= end_year
+        years = self.panel.years[reported]
+        return int(years[-1]) if len(years) else None
+
+    def position(self, country: str, group: str, year: int) -> Optional[Dict]:
+        """`country`'s standing in `group` in `year`, or None without data"""
+        row = self.panel.row(country)
+        standing = self.groups[group]
+        col = np.flatnonzero(self.panel.years == year)
+        if row is None or not len(col) or not standing.rank[row, col[0]]:
+            return None
+        j = col[0]
+        return {
+            'value': float(self.panel.values[row, j]),
+            'rank': int(standing.rank[row, j]),
+            'out_of': int(standing.out_of[row, j]),
+            'percentile': round(float(standing.percentile[row, j]), 2),
+            'z_score': (round(float(standing.z_score[row, j]), 3)
+                        if not np.isnan(standing.z_score[row, j]) else None),
+            'member': bool(standing.member[row]),
+            'peer_mean': float(standing.peer_mean[row, j]),
+            'peer_std': float(standing.peer_std[row, j]),
+            'group_mean': float(standing.mean[j]),
+            'group_median': float(standing.median[j]),
+        }
+
+    def history(self, country: str, group: str) -> Dict:
+        """`country`'s percentile, z-score and rank in every year it could be placed"""
+        row = self.panel.row(country)
+        if row is None:
+            return {'years': [], 'percentile': [], 'z_score': [], 'rank': [], 'out_of': []}
+        standing = self.groups[group]
+        placed = standing.rank[row] > 0
+        z_score = standing.z_score[row, placed].round(3)
+        return {
+            'years': self.panel.years[placed].tolist(),
+            'percentile': standing.percentile[row, placed].round(2).tolist(),
+            'z_score': np.where(np.isnan(z_score), None, z_score).tolist(),
+            'rank': standing.rank[row, placed].tolist(),
+            'out_of': standing.out_of[row, placed].tolist(),
+        }
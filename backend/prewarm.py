@@ -0,0 +1,127 @@
+"""
+Cache Prewarming for IndianPulse
+Fill every comparison cache layer ahead of the first user request
+
+In-process warming fetches and stores World Bank data (the on-disk store
+carries over to every server process) and builds the frame cache, panels and
+ranking tables of the comparator it is given. Under a preloading server,
+warming in the master before fork (PREWARM_ON_START=1) shares those layers
+with every worker. Warming over HTTP fills a running server's own caches.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+# What the radar chart asks for when nothing is selected
+RADAR_COUNTRIES = ['IND', 'CHN', 'USA', 'GBR', 'JPN']
+
+
+def _run(tasks: Dict[str, Callable], max_workers: int, timeout: Optional[float],
+         progress: Optional[Callable]) -> Dict:
+    """Run named tasks in parallel, timing each; failures are reported, not raised"""
+    started = time.perf_counter()
+    results = {}
+    pool = ThreadPoolExecutor(max_workers, thread_name_prefix='prewarm')
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        fn()
+        return round((time.perf_counter() - t0) * 1000, 1)
+
+    futures = {pool.submit(timed, fn): name for name, fn in tasks.items()}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            name = futures[future]
+            try:
+                results[name] = {'ok': True, 'ms': future.result()}
+            except Exception as e:
+                results[name] = {'ok': False, 'error': str(e)}
+            if progress:
+                progress(len(results), len(tasks), name, results[name])
+    except FutureTimeout:
+        for future, name in futures.items():
+            if name not in results:
+                future.cancel()
+                results[name] = {'ok': False, 'error': 'timed out'}
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return {
+        'tasks': results,
+        'failed': [name for name, r in results.items() if not r['ok']],
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def prewarm_comparisons(comparator, indicators: Optional[List[str]] = None,
+                        countries: Optional[List[str]] = None, max_workers: int = 4,
+                        timeout: Optional[float] = None, progress: Optional[Callable] = None) -> Dict:
+    """Warm data, panels, rankings, peer standings and default payloads for every indicator"""
+    indicators = indicators or list(comparator.WB_INDICATORS.keys())
+    countries = countries or list(comparator.COMPARISON_COUNTRIES.keys())
+
+    def warm(indicator):
+        def task():
+            # Fetches and stores anything missing, then pivots the panel
+            comparator.get_panel(indicator, countries)
+            # Refresh expired entries now rather than in the background, so the
+            # layers below are rebuilt from fresh data
+            wb_code = comparator.WB_INDICATORS.get(indicator)
+            stale = comparator.refresher.stale_countries(wb_code, countries) if wb_code else []
+            if stale:
+                comparator.refresh(wb_code, stale)
+                comparator.get_panel(indicator, countries)
+            comparator.get_ranking_table(indicator, countries)
+            comparator.get_comparison_data(indicator)
+            comparator.get_comparison_data(indicator, countries)
+            # Peer standings span every economy, not just `countries`
+            comparator.get_peer_index(indicator)
+        return task
+
+    tasks = {indicator: warm(indicator) for indicator in indicators}
+    report = _run(tasks, max_workers, timeout, progress)
+    # The radar spans several indicators; warm it once they are all in place
+    radar = _run({'multi-indicator': lambda: comparator.get_multi_indicator_comparison(RADAR_COUNTRIES)},
+                 1, timeout, progress)
+    report['tasks'].update(radar['tasks'])
+    report['failed'] += radar['failed']
+    # Reads above may have queued background refreshes; let them land first
+    comparator.refresher.wait_idle(timeout)
+    report['seconds'] = round(report['seconds'] + radar['seconds'], 3)
+    return report
+
+
+def common_paths(comparator, indicators: Optional[List[str]] = None) -> List[str]:
+    """API paths the dashboard requests on first load"""
+    indicators = indicators or list(comparator.WB_INDICATORS.keys())
+    paths = ['/api/indicators', '/api/summary', '/api/correlation',
+             '/api/comparison/countries', '/api/comparison/multi-indicator',
+             '/api/comparison/peers/dashboard']
+    for indicator in indicators:
+        paths += [f'/api/comparison/{indicator}',
+                  f'/api/comparison/rankings/{indicator}',
+                  f'/api/comparison/relative/{indicator}']
+    return paths
+
+
+def prewarm_server(base_url: str, paths: List[str], max_workers: int = 4,
+                   timeout: Optional[float] = None, request_timeout: float = 60.0,
+                   progress: Optional[Callable] = None) -> Dict:
+    """Request every path from a running server so its in-process caches fill
+
+    Each request reaches one worker; with several workers, run it once per
+    worker or prefer PREWARM_ON_START.
+    """
+    session = requests.Session()
+    base_url = base_url.rstrip('/')
+
+    def fetch(path):
+        def task():
+            response = session.get(base_url + path, timeout=request_timeout)
+            response.raise_for_status()
+        return task
+
+    return _run({path: fetch(path) for path in paths}, max_workers, timeout, progress)
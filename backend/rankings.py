@@ -0,0 +1,167 @@
+"""
+Ranking Tables for IndianPulse
+Country rankings for every year of a comparison panel, computed in one pass
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.panel import CountryPanel
+
+# Country subsets whose ranks are kept per table, least recently used dropped first
+SUBSET_CACHE_SIZE = 32
+
+
+def rank_matrix(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Rank every column, highest value first; 0 where a country didn't report
+
+    Ties keep row order, like a stable sort.
+    """
+    n = values.shape[0]
+    order = np.argsort(-np.where(mask, values, -np.inf), axis=0, kind='stable')
+    ranks = np.zeros(values.shape, dtype=int)
+    np.put_along_axis(ranks, order, np.arange(1, n + 1)[:, None].repeat(values.shape[1], axis=1), axis=0)
+    ranks[~mask] = 0
+    return ranks
+
+
+class RankingTable:
+    """Ranks of every country in every year of a panel.
+
+    The full-panel ranks are computed once. A country subset is ranked over
+    every year the first time it is asked for and kept, so repeated requests
+    for the same selection (like the default comparison) are lookups.
+    """
+
+    def __init__(self, panel: CountryPanel):
+        self.panel = panel
+        self.ranks = rank_matrix(panel.values, panel.mask)
+        self._cols = {int(year): j for j, year in enumerate(panel.years)}
+        # tuple of rows -> ranks within those rows, for every year
+        self._subsets: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def years(self) -> List[int]:
+        return [int(year) for year in self.panel.years]
+
+    def _rows(self, countries: Optional[List[str]]) -> np.ndarray:
+        if countries is None:
+            return np.arange(len(self.panel))
+        rows = [self.panel.row(code) for code in dict.fromkeys(countries)]
+        return np.array([row for row in rows if row is not None], dtype=int)
+
+    def _ranks(self, rows: np.ndarray, cols=slice(None)) -> np.ndarray:
+        """Ranks within `rows`, from the full-panel table or the subset's cached table"""
+        if len(rows) == len(self.panel):
+            return self.ranks[rows][:, cols]
+        key = tuple(rows.tolist())
+        with self._lock:
+            ranks = self._subsets.get(key)
+            if ranks is not None:
+                self._subsets.move_to_end(key)
+        if ranks is None:
+            ranks = rank_matrix(self.panel.values[rows], self.panel.mask[rows])
+            with self._lock:
+                self._subsets[key] = ranks
+                while len(self._subsets) > SUBSET_CACHE_SIZE:
+                    self._subsets.popitem(last=False)
+        return ranks[:, cols]
+
+    def latest_year(self, countries: Optional[List[str]] = None,
+                    end_year: Optional[int] = None, min_share: float = 0.0) -> Optional[int]:
+        """Last year at least one of `countries` reported, up to `end_year`
+
+        With `min_share`, that share of the countries with any data must have
+        reported, so a year only the earliest publishers cover isn't picked.
+        """
+        mask = self.panel.mask[self._rows(countries)]
+        counts = mask.sum(axis=0)
+        reported = counts >= max(1, int(np.ceil(min_share * mask.any(axis=1).sum())))
+        if end_year is not None:
+            reported &= self.panel.years <= end_year
+        years = self.panel.years[reported]
+        return int(years[-1]) if len(years) else None
+
+    def for_year(self, year: int, countries: Optional[List[str]] = None) -> List[Dict]:
+        """Ranked rows for one year, best first"""
+        j = self._cols.get(year)
+        if j is None:
+            return []
+        rows = self._rows(countries)
+        ranks = self._ranks(rows, [j])[:, 0]
+        reporting = np.flatnonzero(ranks)
+        reporting = reporting[np.argsort(ranks[reporting], kind='stable')]
+        return [{
+            'rank': int(ranks[i]),
+            'country_code': self.panel.codes[rows[i]],
+            'country': self.panel.names[rows[i]],
+            'value': float(self.panel.values[rows[i], j]),
+        } for i in reporting]
+
+    def top(self, year: int, n: int = 10, countries: Optional[List[str]] = None,
+            ascending: bool = False, include: Optional[str] = None) -> Dict:
+        """The `n` highest (or lowest) ranked rows for one year and how many reported
+
+        `include` names a country whose own rank is returned alongside, in or
+        out of the top `n`.
+        """
+        j = self._cols.get(year)
+        rows = self._rows(countries)
+        if j is None or not len(rows):
+            return {'rankings': [], 'out_of': 0, 'included': None}
+        ranks = self._ranks(rows, [j])[:, 0]
+        out_of = int((ranks > 0).sum())
+        chosen = np.flatnonzero((ranks > 0) & ((ranks > out_of - n) if ascending else (ranks <= n)))
+        chosen = chosen[np.argsort(ranks[chosen], kind='stable')]
+        if ascending:
+            chosen = chosen[::-1]
+
+        def entry(i):
+            return {
+                'rank': int(ranks[i]),
+                'country_code': self.panel.codes[rows[i]],
+                'country': self.panel.names[rows[i]],
+                'value': float(self.panel.values[rows[i], j]),
+            }
+
+        position = np.flatnonzero(rows == self.panel.row(include)) if include else []
+        included = entry(position[0]) if len(position) and ranks[position[0]] else None
+        return {'rankings': [entry(i) for i in chosen], 'out_of': out_of, 'included': included}
+
+    def distribution(self, year: int, countries: Optional[List[str]] = None,
+                     percentiles: List[float] = (10, 25, 50, 75, 90)) -> Dict:
+        """Percentile cutoffs, mean and spread of one year's reported values"""
+        j = self._cols.get(year)
+        rows = self._rows(countries)
+        if j is None or not len(rows):
+            return {'count': 0, 'percentiles': {}, 'mean': None, 'std': None}
+        reporting = self.panel.mask[rows, j]
+        values = self.panel.values[rows, j][reporting]
+        if not len(values):
+            return {'count': 0, 'percentiles': {}, 'mean': None, 'std': None}
+        cutoffs = np.percentile(values, percentiles)
+        return {
+            'count': int(len(values)),
+            'percentiles': {f"{q:g}": float(v) for q, v in zip(percentiles, cutoffs)},
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+        }
+
+    def history(self, country: str, countries: Optional[List[str]] = None) -> Dict:
+        """Rank of `country` in every year it reported, and how many countries were ranked"""
+        rows = self._rows(countries)
+        position = np.flatnonzero(rows == self.panel.row(country))
+        if not len(position):
+            return {'years': [], 'ranks': [], 'out_of': []}
+        ranks = self._ranks(rows)
+        country_ranks = ranks[position[0]]
+        observed = country_ranks > 0
+        return {
+            'years': self.panel.years[observed].tolist(),
+            'ranks': country_ranks[observed].tolist(),
+            'out_of': (ranks[:, observed] > 0).sum(axis=0).tolist(),
+        }
@@ -0,0 +1,151 @@
+"""
+Background Refresh for IndianPulse
+Stale-while-revalidate expiry and proactive refresh of World Bank data
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set, Tuple
+
+
+class BackgroundRefresher:
+    """Refresh stored (indicator, country) entries without blocking readers.
+
+    Entries older than `ttl` are stale: readers still get them immediately and
+    a refresh is queued here. A scheduler thread also scans the store and
+    refreshes entries within `lead` of expiring, at a jittered interval, so
+    several workers don't all refresh at once. At most `max_concurrent`
+    refreshes run at a time and each (indicator, country) is queued only once.
+    """
+
+    def __init__(self, comparator, ttl: float = None, lead: float = 0.1,
+                 interval: float = None, max_concurrent: int = None, jitter: float = 0.2):
+        self.comparator = comparator
+        self.ttl = ttl or float(os.environ.get('WORLD_BANK_TTL_HOURS', 24)) * 3600
+        self.lead = lead
+        self.interval = interval or float(os.environ.get('WORLD_BANK_REFRESH_INTERVAL', 300))
+        self.max_concurrent = max_concurrent or int(os.environ.get('WORLD_BANK_REFRESH_CONCURRENCY', 2))
+        self.jitter = jitter
+        self.refreshed = 0
+        self.failed = 0
+        self.stale_served = 0
+        self._reset()
+        # The executor and scheduler thread don't survive fork; start again in each worker
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._scheduler = None
+        self._stop = threading.Event()
+        self._queued: Set[Tuple[str, str]] = set()
+        self._idle = threading.Condition(self._lock)
+
+    def is_stale(self, fetched_at: float, now: float = None) -> bool:
+        return (now or time.time()) - fetched_at >= self.ttl
+
+    def stale_countries(self, indicator: str, country_codes: List[str]) -> List[str]:
+        """Requested countries whose stored entry has expired"""
+        fetched_at = self.comparator.store.fetched_at(indicator)
+        now = time.time()
+        return [code for code in country_codes
+                if code in fetched_at and self.is_stale(fetched_at[code], now)]
+
+    def schedule(self, indicator: str, country_codes: List[str]) -> int:
+        """Queue a refresh for the countries not already queued; returns how many"""
+        with self._lock:
+            codes = [code for code in country_codes if (indicator, code) not in self._queued]
+            if not codes:
+                return 0
+            self._queued.update((indicator, code) for code in codes)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_concurrent, thread_name_prefix='refresh')
+            executor = self._executor
+        executor.submit(self._refresh, indicator, codes)
+        return len(codes)
+
+    def serve_stale(self, indicator: str, country_codes: List[str]):
+        """Note that stale entries were served and queue their refresh"""
+        stale = self.stale_countries(indicator, country_codes)
+        if stale:
+            with self._lock:
+                self.stale_served += len(stale)
+            self.schedule(indicator, stale)
+
+    def _refresh(self, indicator: str, country_codes: List[str]):
+        try:
+            frames = self.comparator.refresh(indicator, country_codes)
+            with self._lock:
+                self.refreshed += len(frames)
+                self.failed += len(country_codes) - len(frames)
+        except Exception as e:
+            print(f"Background refresh of {indicator} failed: {e}")
+            with self._lock:
+                self.failed += len(country_codes)
+        finally:
+            with self._lock:
+                self._queued.difference_update((indicator, code) for code in country_codes)
+                if not self._queued:
+                    self._idle.notify_all()
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until no refresh is queued or running; False on timeout"""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._queued, timeout)
+
+    def due(self) -> Dict[str, List[str]]:
+        """Stored entries that expire within `lead` of the TTL, per indicator"""
+        threshold = time.time() - self.ttl * (1 - self.lead)
+        due = {}
+        for indicator in self.comparator.store.indicators():
+            codes = [code for code, fetched_at in self.comparator.store.fetched_at(indicator).items()
+                     if fetched_at <= threshold]
+            if codes:
+                due[indicator] = codes
+        return due
+
+    def scan(self) -> int:
+        """Queue every entry close to expiry; returns how many were queued"""
+        queued = 0
+        due = list(self.due().items())
+        # Random order so workers scanning together spread over different indicators
+        random.shuffle(due)
+        for indicator, codes in due:
+            queued += self.schedule(indicator, codes)
+        return queued
+
+    def ensure_started(self):
+        """Start the scheduler thread in this process if it isn't running"""
+        with self._lock:
+            if self._scheduler is not None and self._scheduler.is_alive():
+                return
+            self._scheduler = threading.Thread(target=self._run, name='refresh-scheduler', daemon=True)
+            self._scheduler.start()
+
+    def _run(self):
+        # Jitter the first scan too, so workers started together don't align
+        delay = random.uniform(0, self.interval * self.jitter)
+        while not self._stop.wait(delay):
+            try:
+                self.scan()
+            except Exception as e:
+                print(f"Refresh scan failed: {e}")
+            delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'ttl_seconds': self.ttl,
+                'queued': len(self._queued),
+                'refreshed': self.refreshed,
+                'failed': self.failed,
+                'stale_served': self.stale_served,
+                'scheduler_running': self._scheduler is not None and self._scheduler.is_alive(),
+            }
@@ -0,0 +1,80 @@
+"""
+Relative Comparison for IndianPulse
+Every country of a comparison panel against a baseline, computed in one pass
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+from backend.panel import CountryPanel
+
+# What each mode reads for a country equal to its baseline
+MODES = {
+    'ratio': 100.0,           # value / baseline * 100
+    'difference': 0.0,        # value - baseline
+    'log_difference': 0.0,    # 100 * ln(value / baseline), ~ percent difference
+}
+
+
+def relative_matrix(values: np.ndarray, mask: np.ndarray, reference: np.ndarray,
+                    reference_mask: np.ndarray, mode: str = 'ratio'):
+    """`values` against a broadcastable `reference`; returns (relative, valid)
+
+    A cell is valid where both sides are observed and the mode is defined
+    there (no zero baseline for ratios, positive values for logs); others are NaN.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'; expected one of {', '.join(MODES)}")
+    valid = mask & reference_mask
+    reference = np.broadcast_to(reference, values.shape)
+    relative = np.full(values.shape, np.nan)
+    if mode == 'ratio':
+        valid &= reference != 0
+        np.divide(values * 100, reference, out=relative, where=valid)
+    elif mode == 'difference':
+        np.subtract(values, reference, out=relative, where=valid)
+    else:
+        valid &= (values > 0) & (reference > 0)
+        np.log(np.divide(values, reference, out=np.ones(values.shape), where=valid),
+               out=relative, where=valid)
+        relative *= 100
+    return relative, valid
+
+
+class RelativeIndex:
+    """A panel relative to one baseline, for every country and year.
+
+    The baseline is either `base_country`'s value in the same year, or, with
+    `base_year`, each country's own value in that year (rebasing every series
+    to 100 or 0 there). Subsets are slices of the same matrix.
+    """
+
+    def __init__(self, panel: CountryPanel, mode: str = 'ratio',
+                 base_country: Optional[str] = None, base_year: Optional[int] = None):
+        self.panel = panel
+        self.mode = mode
+        self.base_country = base_country
+        self.base_year = base_year
+        if base_year is not None:
+            col = np.flatnonzero(panel.years == base_year)
+            if not len(col):
+                raise ValueError(f"No data for base year {base_year}")
+            reference, reference_mask = panel.values[:, col], panel.mask[:, col]
+        else:
+            row = panel.row(base_country)
+            if row is None:
+                raise ValueError(f"No data for base country {base_country}")
+            reference, reference_mask = panel.values[row][None, :], panel.mask[row][None, :]
+        self.values, self.valid = relative_matrix(panel.values, panel.mask, reference,
+                                                  reference_mask, mode)
+
+    @property
+    def neutral(self) -> float:
+        return MODES[self.mode]
+
+    def select(self, countries: List[str], years: List[int]):
+        """(values, valid) for `countries` in `years`, both present in the panel"""
+        rows = np.array([self.panel.row(code) for code in countries], dtype=int)
+        cols = np.searchsorted(self.panel.years, years)
+        return self.values[np.ix_(rows, cols)], self.valid[np.ix_(rows, cols)]
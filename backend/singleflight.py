@@ -0,0 +1,73 @@
+"""
+Request Coalescing for IndianPulse
+Concurrent callers with the same key share one in-progress computation
+"""
+
+import threading
+from typing import Callable, Dict, Hashable
+
+from backend.tracing import tracer
+
+
+class _Call:
+    """An in-progress computation that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run `fn` once per key at a time and hand its result to every concurrent caller.
+
+    Results are shared between callers, so they must be treated as read-only.
+    """
+
+    def __init__(self, name: str = 'singleflight'):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            with tracer.span('singleflight.wait', group=self.name):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict:
+        return {
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'in_flight': self.in_flight(),
+        }
@@ -0,0 +1,200 @@
+"""
+Slow Request Log for IndianPulse
+Records requests slower than a threshold with parameters and phase timings
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.tracing import Span, Tracer, tracer
+
+
+# Query parameters whose values are lists of codes
+LIST_PARAMS = {'countries', 'indicators'}
+INT_PARAMS = {'start_year', 'end_year', 'year', 'n'}
+
+
+def normalize_params(args) -> Dict:
+    """Canonical form of request query parameters so equal queries group together"""
+    params = {}
+    for key in sorted(args.keys()):
+        value = str(args.get(key, '')).strip()
+        if key in LIST_PARAMS:
+            items = {item.strip().upper() for item in value.split(',') if item.strip()}
+            params[key] = ','.join(sorted(items))
+        elif key in INT_PARAMS:
+            try:
+                params[key] = int(value)
+            except ValueError:
+                params[key] = value
+        elif key in ('range', 'base'):
+            params[key] = value.upper()
+        else:
+            params[key] = value.lower()
+    return params
+
+
+class SlowRequestLog:
+    """Append a structured JSONL entry for every request over the threshold"""
+
+    _instances: Dict[str, 'SlowRequestLog'] = {}
+
+    def __init__(self, path: str = 'logs/slow_requests.jsonl', threshold_ms: float = 1000.0):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional['SlowRequestLog']:
+        """Configure from SLOW_REQUEST_LOG and SLOW_REQUEST_MS ('off' disables)"""
+        path = os.environ.get('SLOW_REQUEST_LOG', 'logs/slow_requests.jsonl')
+        if path.lower() == 'off':
+            return None
+        # One instance per file so apps sharing a process don't log twice
+        if path not in cls._instances:
+            cls._instances[path] = cls(path, float(os.environ.get('SLOW_REQUEST_MS', 1000)))
+        return cls._instances[path]
+
+    def build_entry(self, root: Span) -> Dict:
+        """Summarize a finished request trace into a log entry"""
+        attrs = root.attributes
+        phases = []
+        cache_states = set()
+        split = {'pandas_ms': 0.0, 'fetch_ms': 0.0, 'serialize_ms': 0.0}
+
+        for span in sorted(root.spans, key=lambda s: s.start_ns):
+            if span is root:
+                continue
+            phase = {'name': span.name, 'ms': round(span.duration_ms, 3)}
+            for key in ('rows', 'rows_in', 'indicator', 'dataset'):
+                if key in span.attributes:
+                    phase[key] = span.attributes[key]
+            phases.append(phase)
+            if 'cache' in span.attributes:
+                cache_states.add(span.attributes['cache'])
+
+            # Only direct children count towards the split so nested spans aren't double counted
+            if span.parent_id != root.span_id:
+                continue
+            if span.name.startswith('serialize.'):
+                split['serialize_ms'] += span.duration_ms
+            elif span.name == 'worldbank.fetch':
+                split['fetch_ms'] += span.duration_ms
+            else:
+                split['pandas_ms'] += span.duration_ms
+
+        if not cache_states:
+            cache = None
+        elif len(cache_states) == 1:
+            cache = cache_states.pop()
+        else:
+            cache = 'mixed'
+
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'route': attrs.get('route'),
+            'method': attrs.get('method'),
+            'status_code': attrs.get('status_code'),
+            'view_args': {k: v for k, v in attrs.items()
+                          if k not in ('route', 'method', 'status_code', 'params', 'error')},
+            'params': attrs.get('params', {}),
+            'duration_ms': round(root.duration_ms, 3),
+            'cache': cache,
+            'phases': phases,
+        }
+        entry.update({k: round(v, 3) for k, v in split.items()})
+        entry['other_ms'] = round(max(root.duration_ms - sum(split.values()), 0.0), 3)
+        return entry
+
+    def record(self, root: Span):
+        """Tracer listener: log the request if it crossed the threshold"""
+        if root.name != 'http.request' or root.duration_ms < self.threshold_ms:
+            return
+        line = json.dumps(self.build_entry(root), default=str) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def install(self, app, tracer: Tracer = tracer):
+        """Attach to a Flask app already wrapped by `instrument_flask`"""
+        from flask import request
+
+        @app.before_request
+        def _tag_params():
+            root = tracer.current_root()
+            if root is not None:
+                root.set('params', normalize_params(request.args))
+
+        if self.record not in tracer.listeners:
+            tracer.add_listener(self.record)
+        return self
+
+
+def load_entries(path: str) -> List[Dict]:
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return entries
+
+
+def top_offenders(entries: List[Dict], top: int = 10, by: str = 'total') -> List[Dict]:
+    """Group entries by route, path arguments and parameters, worst first"""
+    groups = defaultdict(list)
+    for entry in entries:
+        key = json.dumps([entry.get('route'), entry.get('view_args', {}), entry.get('params', {})],
+                         sort_keys=True)
+        groups[key].append(entry)
+
+    rows = []
+    for key, items in groups.items():
+        route, view_args, params = json.loads(key)
+        durations = np.array([e['duration_ms'] for e in items])
+        total = durations.sum()
+        rows.append({
+            'route': route,
+            'view_args': view_args,
+            'params': params,
+            'count': len(items),
+            'total_ms': round(float(total), 1),
+            'p50_ms': round(float(np.percentile(durations, 50)), 1),
+            'p95_ms': round(float(np.percentile(durations, 95)), 1),
+            'max_ms': round(float(durations.max()), 1),
+            'pandas_share': round(sum(e.get('pandas_ms', 0) for e in items) / total, 3) if total else 0,
+            'serialize_share': round(sum(e.get('serialize_ms', 0) for e in items) / total, 3) if total else 0,
+            'cache_misses': sum(1 for e in items if e.get('cache') in ('miss', 'mixed')),
+        })
+    sort_key = {'total': 'total_ms', 'p95': 'p95_ms', 'count': 'count', 'max': 'max_ms'}[by]
+    return sorted(rows, key=lambda r: r[sort_key], reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize the slow request log into top offenders")
+    parser.add_argument('path', nargs='?', default='logs/slow_requests.jsonl')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--by', choices=['total', 'p95', 'count', 'max'], default='total')
+    args = parser.parse_args()
+
+    entries = load_entries(args.path)
+    print(f"{len(entries)} slow requests in {args.path}\n")
+    for i, row in enumerate(top_offenders(entries, args.top, args.by), 1):
+        target = row['route'] + ''.join(f" {k}={v}" for k, v in row['view_args'].items())
+        params = '&'.join(f"{k}={v}" for k, v in row['params'].items()) or '-'
+        print(f"{i:>2}. {target}  ?{params}")
+        print(f"    count={row['count']} total={row['total_ms']}ms p50={row['p50_ms']}ms "
+              f"p95={row['p95_ms']}ms max={row['max_ms']}ms")
+        print(f"    pandas={row['pandas_share']:.0%} serialize={row['serialize_share']:.0%} "
+              f"cache_misses={row['cache_misses']}")
@@ -0,0 +1,410 @@
+"""
+Tracing Module for IndianPulse
+Lightweight span tracing across data load, filter, aggregate and serialize stages
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+class Span:
+    """A single timed stage of a request"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self._start_perf = time.perf_counter()
+        self.duration_ms = None
+        # Only populated on root spans: every finished span of the trace
+        self.spans: List['Span'] = []
+
+    def set(self, key: str, value):
+        """Attach an attribute (row counts, cache status, ...) to the span"""
+        self.attributes[key] = value
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start_perf) * 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start_ns,
+            'duration_ms': round(self.duration_ms or 0.0, 3),
+            'attributes': self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned when tracing is disabled"""
+
+    attributes = {}
+
+    def set(self, key: str, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class JsonlSpanExporter:
+    """Append finished spans to a local JSONL file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        lines = ''.join(json.dumps(span.to_dict(), default=str) + '\n' for span in spans)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _from_otlp_value(value: Dict):
+    if 'intValue' in value:
+        return int(value['intValue'])
+    if 'doubleValue' in value:
+        return float(value['doubleValue'])
+    if 'boolValue' in value:
+        return bool(value['boolValue'])
+    return value.get('stringValue')
+
+
+class OTLPSpanExporter:
+    """Send spans as OTLP/JSON to a collector from a background thread
+
+    The thread starts with the first export, so a tracer created in a
+    preloading master doesn't leave forked workers with a queue nobody reads;
+    each worker also gets a fresh queue, session and thread after fork.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = 'indianpulse', timeout: float = 2.0):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.service_name = service_name
+        self.timeout = timeout
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=1000)
+        self._session = requests.Session()
+        self._worker = None
+
+    def _ensure_started(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                worker = threading.Thread(target=self._run, name='otlp-exporter', daemon=True)
+                worker.start()
+                self._worker = worker
+
+    def export(self, spans: List[Span]):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            pass  # Drop rather than slow down requests
+
+    def to_payload(self, spans: List[Span]) -> Dict:
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [
+                    {'key': 'service.name', 'value': {'stringValue': self.service_name}}
+                ]},
+                'scopeSpans': [{
+                    'scope': {'name': 'indianpulse.tracing'},
+                    'spans': [{
+                        'traceId': span.trace_id,
+                        'spanId': span.span_id,
+                        'parentSpanId': span.parent_id or '',
+                        'name': span.name,
+                        'kind': 1,
+                        'startTimeUnixNano': str(span.start_ns),
+                        'endTimeUnixNano': str(span.start_ns + int((span.duration_ms or 0) * 1e6)),
+                        'attributes': [
+                            {'key': k, 'value': _otlp_value(v)} for k, v in span.attributes.items()
+                        ],
+                    } for span in spans],
+                }],
+            }]
+        }
+
+    def _run(self):
+        while True:
+            spans = self._queue.get()
+            try:
+                self._session.post(self.url, json=self.to_payload(spans), timeout=self.timeout)
+            except Exception as e:
+                print(f"Error exporting spans to {self.url}: {e}")
+
+
+class Tracer:
+    """Record nested spans per thread and export each finished trace"""
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        self.listeners: List[Callable[[Span], None]] = []
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls) -> 'Tracer':
+        """Configure from TRACE_FILE and/or TRACE_OTLP_ENDPOINT"""
+        if os.environ.get('TRACE_OTLP_ENDPOINT'):
+            return cls(OTLPSpanExporter(os.environ['TRACE_OTLP_ENDPOINT']))
+        if os.environ.get('TRACE_FILE'):
+            return cls(JsonlSpanExporter(os.environ['TRACE_FILE']))
+        return cls()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None or bool(self.listeners)
+
+    def add_listener(self, callback: Callable[[Span], None]):
+        """Call `callback(root_span)` whenever a trace finishes"""
+        self.listeners.append(callback)
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current_root(self) -> Optional[Span]:
+        stack = self._stack()
+        return stack[0] if stack else None
+
+    def start_span(self, name: str, **attributes):
+        if not self.enabled:
+            return _NOOP_SPAN
+        stack = self._stack()
+        if stack:
+            span = Span(name, stack[-1].trace_id, stack[-1].span_id, attributes)
+        else:
+            span = Span(name, _new_id(16), None, attributes)
+        stack.append(span)
+        return span
+
+    def end_span(self, span):
+        if span is _NOOP_SPAN:
+            return
+        span.finish()
+        stack = self._stack()
+        if span in stack:
+            del stack[stack.index(span):]
+        root = stack[0] if stack else span
+        root.spans.append(span)
+        if span is root:
+            self._finish_trace(root)
+
+    def _finish_trace(self, root: Span):
+        if self.exporter is not None:
+            try:
+                self.exporter.export(root.spans)
+            except Exception as e:
+                print(f"Error exporting trace {root.trace_id}: {e}")
+        for listener in self.listeners:
+            try:
+                listener(root)
+            except Exception as e:
+                print(f"Error in trace listener: {e}")
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block as a child of the current span"""
+        span = self.start_span(name, **attributes)
+        try:
+            yield span
+        except Exception as e:
+            span.set('error', type(e).__name__)
+            raise
+        finally:
+            self.end_span(span)
+
+
+tracer = Tracer.from_env()
+
+
+def instrument_flask(app, tracer: Tracer = tracer):
+    """Wrap every request in a root span and time JSON encoding"""
+    from flask import g, request
+    from flask.json.provider import DefaultJSONProvider
+
+    class TracedJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            with tracer.span('serialize.json') as span:
+                data = super().dumps(obj, **kwargs)
+                span.set('bytes', len(data))
+            return data
+
+    app.json = TracedJSONProvider(app)
+
+    @app.before_request
+    def _start_request_span():
+        route = request.url_rule.rule if request.url_rule else request.path
+        span = tracer.start_span('http.request', route=route, method=request.method)
+        for key, value in (request.view_args or {}).items():
+            span.set(key, value)
+        g._trace_span = span
+
+    @app.after_request
+    def _tag_response(response):
+        span = g.get('_trace_span')
+        if span is not None:
+            span.set('status_code', response.status_code)
+        return response
+
+    @app.teardown_request
+    def _end_request_span(exc):
+        span = g.pop('_trace_span', None)
+        if span is not None:
+            if exc is not None:
+                span.set('error', type(exc).__name__)
+            tracer.end_span(span)
+
+    return app
+
+
+def load_spans(path: str) -> Dict[str, List[Dict]]:
+    """Read a JSONL span file grouped by trace id"""
+    traces = defaultdict(list)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                span = json.loads(line)
+                traces[span['trace_id']].append(span)
+    return traces
+
+
+def summarize(path: str) -> List[Dict]:
+    """Time per stage for every (route, indicator), dominant stage first"""
+    groups = defaultdict(lambda: {'requests': 0, 'total_ms': 0.0, 'stages': defaultdict(float)})
+    for spans in load_spans(path).values():
+        roots = [s for s in spans if s['parent_id'] is None]
+        if not roots:
+            continue
+        root = roots[0]
+        attrs = root['attributes']
+        key = (attrs.get('route', root['name']), attrs.get('indicator', ''))
+        group = groups[key]
+        group['requests'] += 1
+        group['total_ms'] += root['duration_ms']
+        for span in spans:
+            if span is not root:
+                group['stages'][span['name']] += span['duration_ms']
+
+    rows = []
+    for (route, indicator), group in groups.items():
+        stages = sorted(group['stages'].items(), key=lambda kv: kv[1], reverse=True)
+        rows.append({
+            'route': route,
+            'indicator': indicator,
+            'requests': group['requests'],
+            'avg_ms': round(group['total_ms'] / group['requests'], 2),
+            'stages': [(name, round(ms / group['requests'], 2)) for name, ms in stages],
+        })
+    return sorted(rows, key=lambda r: r['avg_ms'], reverse=True)
+
+
+def run_collector(port: int, out_path: str):
+    """OTLP/HTTP collector stand-in that writes received spans as JSONL"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    lock = threading.Lock()
+
+    class CollectorHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            lines = []
+            try:
+                payload = json.loads(body)
+                for resource in payload.get('resourceSpans', []):
+                    for scope in resource.get('scopeSpans', []):
+                        for s in scope.get('spans', []):
+                            start = int(s['startTimeUnixNano'])
+                            lines.append(json.dumps({
+                                'trace_id': s['traceId'],
+                                'span_id': s['spanId'],
+                                'parent_id': s.get('parentSpanId') or None,
+                                'name': s['name'],
+                                'start': start,
+                                'duration_ms': (int(s['endTimeUnixNano']) - start) / 1e6,
+                                'attributes': {a['key']: _from_otlp_value(a['value'])
+                                               for a in s.get('attributes', [])},
+                            }) + '\n')
+            except (ValueError, KeyError) as e:
+                self.send_error(400, str(e))
+                return
+            with lock:
+                with open(out_path, 'a', encoding='utf-8') as f:
+                    f.writelines(lines)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"Collecting spans on http://localhost:{port}/v1/traces -> {out_path}")
+    ThreadingHTTPServer(('0.0.0.0', port), CollectorHandler).serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="IndianPulse tracing tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    collect = sub.add_parser('collect', help='run an OTLP/HTTP collector stand-in')
+    collect.add_argument('--port', type=int, default=4318)
+    collect.add_argument('--out', default='spans.jsonl')
+
+    report = sub.add_parser('summary', help='show which stage dominates per route and indicator')
+    report.add_argument('path', nargs='?', default='spans.jsonl')
+
+    args = parser.parse_args()
+    if args.command == 'collect':
+        run_collector(args.port, args.out)
+    else:
+        for row in summarize(args.path):
+            label = f"{row['route']} [{row['indicator']}]" if row['indicator'] else row['route']
+            print(f"{label}: {row['requests']} requests, avg {row['avg_ms']} ms")
+            for name, ms in row['stages'][:5]:
+                print(f"    {name:<28} {ms:>10.2f} ms")
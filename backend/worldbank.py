@@ -0,0 +1,343 @@
+"""
+World Bank API Client for IndianPulse
+Concurrent indicator fetching over pooled keep-alive HTTP sessions
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.tracing import tracer
+
+DEFAULT_BASE_URL = 'https://api.worldbank.org/v2'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream errors, probing periodically to recover.
+
+    Closed: calls go through. After `failure_threshold` consecutive failures it
+    opens and every call fails immediately. Once `reset_timeout` has passed,
+    one probe call is let through (half-open); success closes the circuit and
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether a call would be allowed right now (without claiming the probe)"""
+        with self._lock:
+            available = self.state == 'closed' or (
+                self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout)
+            self.rejected += not available
+            return available
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.opens += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'opens': self.opens,
+                'rejected': self.rejected,
+            }
+
+
+class NegativeCache:
+    """(indicator, country) pairs that recently returned nothing, until they expire"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        self.skipped = 0
+
+    def add(self, indicator: str, country_codes: List[str]):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for code in country_codes:
+                self._entries[(indicator, code)] = expires_at
+
+    def filter(self, indicator: str, country_codes: List[str]) -> List[str]:
+        """Countries not known to be empty or failing"""
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, expires_at in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+            codes = [code for code in country_codes if (indicator, code) not in self._entries]
+            self.skipped += len(country_codes) - len(codes)
+            return codes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class WorldBankClient:
+    """Fetch many countries at once through a bounded thread pool.
+
+    Countries are grouped into batched `country/A;B;C/indicator/...` calls and
+    every page is followed. All requests share one keep-alive session. Each
+    host gets a concurrency limit, and every fetch has an overall deadline, so
+    a slow upstream can't hold a request thread for N x timeout.
+
+    Countries that came back empty are not asked for again until
+    `negative_ttl` passes. Countries whose call failed are not cached, so
+    they are retried as soon as the upstream recovers; a per-host circuit
+    breaker skips the API entirely while it keeps failing.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, max_workers: int = None,
+                 per_host_limit: int = None, timeout: float = 10.0, deadline: float = None,
+                 batch_size: int = 40, per_page: int = 1000, negative_ttl: float = None,
+                 failure_threshold: int = None, reset_timeout: float = None):
+        self.base_url = (base_url or os.environ.get('WORLD_BANK_API_URL', DEFAULT_BASE_URL)).rstrip('/')
+        self.max_workers = max_workers or int(os.environ.get('WORLD_BANK_MAX_WORKERS', 10))
+        self.per_host_limit = per_host_limit or int(os.environ.get('WORLD_BANK_PER_HOST', 10))
+        self.timeout = timeout
+        self.deadline = deadline or float(os.environ.get('WORLD_BANK_DEADLINE', 15))
+        self.batch_size = batch_size
+        self.per_page = per_page
+        self.failure_threshold = failure_threshold or int(os.environ.get('WORLD_BANK_FAILURE_THRESHOLD', 5))
+        self.reset_timeout = reset_timeout or float(os.environ.get('WORLD_BANK_RESET_TIMEOUT', 30))
+        self.negative = NegativeCache(negative_ttl or float(os.environ.get('WORLD_BANK_NEGATIVE_TTL', 300)))
+        self._lock = threading.Lock()
+        self._reset()
+        # Threads and sockets don't survive fork; give each worker its own
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='worldbank')
+            return self._executor
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def get_json(self, url: str, params: Dict, deadline_at: float):
+        """GET within the host limit and what is left of the deadline"""
+        limit = self._host_limit(url)
+        if not limit.acquire(timeout=max(deadline_at - time.monotonic(), 0)):
+            raise TimeoutError(f"deadline exceeded waiting for a connection to {url}")
+        try:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"deadline exceeded before requesting {url}")
+            breaker = self.breaker(url)
+            if not breaker.allow():
+                raise CircuitOpenError(f"circuit open for {urlparse(url).netloc}")
+            try:
+                response = self.session.get(url, params=params, timeout=min(self.timeout, remaining))
+                if response.status_code == 429 or response.status_code >= 500:
+                    response.raise_for_status()
+                data = response.json()
+            except (requests.RequestException, ValueError):
+                breaker.record_failure()
+                raise
+            # The host answered; a 4xx is our request's problem, not an outage
+            breaker.record_success()
+            response.raise_for_status()
+            return data
+        finally:
+            limit.release()
+
+    def _fetch_page(self, indicator: str, country_codes: List[str], start_year: int,
+                    end_year: int, page: int, deadline_at: float, columns: '_Columns') -> int:
+        """Fetch one page of a batched multi-country call; returns the total page count"""
+        url = f"{self.base_url}/country/{';'.join(country_codes)}/indicator/{indicator}"
+        params = {
+            'format': 'json',
+            'date': f'{start_year}:{end_year}',
+            'per_page': self.per_page,
+            'page': page,
+        }
+        data = self.get_json(url, params, deadline_at)
+        if not isinstance(data, list) or len(data) < 2 or not data[1]:
+            return 1
+        columns.extend(data[1], country_codes[0] if len(country_codes) == 1 else None)
+        return int(data[0].get('pages', 1))
+
+    def fetch_indicator(self, indicator: str, country_codes: List[str], start_year: int,
+                        end_year: int, deadline: Optional[float] = None) -> pd.DataFrame:
+        """One indicator for many countries in batched calls, following every page
+
+        Countries that return nothing are missing from the frame; while the
+        circuit is open the frame is empty and no request is made.
+        """
+        country_codes = self.negative.filter(indicator, country_codes)
+        if not country_codes:
+            return pd.DataFrame()
+        if not self.breaker(self.base_url).available():
+            print(f"World Bank API circuit open; not fetching {indicator}")
+            return pd.DataFrame()
+
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        pool = self._pool()
+        columns = _Columns(indicator)
+        batches = [country_codes[i:i + self.batch_size]
+                   for i in range(0, len(country_codes), self.batch_size)]
+        failed: List[str] = []
+
+        with tracer.span('worldbank.http', indicator=indicator, countries=len(country_codes),
+                         batches=len(batches)) as span:
+            # First page of every batch tells us how many more pages to request
+            first = {pool.submit(self._fetch_page, indicator, batch, start_year, end_year,
+                                 1, deadline_at, columns): batch for batch in batches}
+            rest = {}
+            for future in self._collect(first, deadline_at, indicator, failed):
+                for page in range(2, future.result() + 1):
+                    rest[pool.submit(self._fetch_page, indicator, first[future], start_year,
+                                     end_year, page, deadline_at, columns)] = first[future]
+            list(self._collect(rest, deadline_at, indicator, failed))
+            span.set('requests', len(first) + len(rest))
+            span.set('rows', len(columns))
+
+            # Don't ask again for a while for countries that really came back empty.
+            # A batch with any failed page (error, timeout or open circuit) proves
+            # nothing about its countries, so they are retried on the next miss
+            returned, unknown = set(columns.codes), set(failed)
+            empty = [code for code in country_codes if code not in returned and code not in unknown]
+            if empty:
+                self.negative.add(indicator, empty)
+                span.set('negative_cached', len(empty))
+            if failed:
+                span.set('failed', len(unknown))
+        return columns.to_frame()
+
+    def _collect(self, futures: Dict, deadline_at: float, indicator: str, failed: List[str]):
+        """Yield futures that finished in time and succeeded; report the rest
+
+        Countries whose call timed out, failed or was refused by an open
+        circuit go to `failed`.
+        """
+        done, pending = wait(futures, timeout=max(deadline_at - time.monotonic(), 0))
+        for future in pending:
+            future.cancel()
+            failed.extend(futures[future])
+            print(f"Timed out fetching {indicator} for {';'.join(futures[future])}")
+        for future in done:
+            try:
+                future.result()
+            except CircuitOpenError:
+                failed.extend(futures[future])
+                continue
+            except Exception as e:
+                failed.extend(futures[future])
+                print(f"Error fetching {indicator} for {';'.join(futures[future])}: {e}")
+                continue
+            yield future
+
+    def stats(self) -> Dict:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            'circuits': {host: breaker.stats() for host, breaker in breakers.items()},
+            'negative_cached': len(self.negative),
+            'negative_skipped': self.negative.skipped,
+        }
+
+
+class _Columns:
+    """Parsed observations accumulated straight into column lists"""
+
+    def __init__(self, indicator: str):
+        self.indicator = indicator
+        self._lock = threading.Lock()
+        self.codes: List[str] = []
+        self.names: List[str] = []
+        self.years: List[int] = []
+        self.values: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def extend(self, items: List[Dict], default_code: Optional[str] = None):
+        codes, names, years, values = [], [], [], []
+        for item in items:
+            value = item.get('value')
+            if value is None:
+                continue
+            codes.append(item.get('countryiso3code') or default_code or item['country']['id'])
+            names.append(item['country']['value'])
+            years.append(item['date'])
+            values.append(value)
+        with self._lock:
+            self.codes.extend(codes)
+            self.names.extend(names)
+            self.years.extend(years)
+            self.values.extend(values)
+
+    def to_frame(self) -> pd.DataFrame:
+        if not self.values:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            'country_code': self.codes,
+            'country': self.names,
+            'year': np.array(self.years, dtype=int),
+            'value': np.array(self.values, dtype=float),
+            'indicator': self.indicator,
+        })
@@ -0,0 +1,169 @@
+"""
+World Bank API Stub for IndianPulse
+Local stand-in for api.worldbank.org used to exercise the fetch path offline
+
+    python -m backend.worldbank_stub --port 8099 --latency 200
+    WORLD_BANK_API_URL=http://localhost:8099/v2 python api_server.py
+
+Faults can be injected to exercise the circuit breaker and negative cache:
+
+    python -m backend.worldbank_stub --fail-rate 1.0 --fail-status 503
+    python -m backend.worldbank_stub --fail-rate 0.5 --drop
+"""
+
+import json
+import random
+import re
+import socket
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+PATH_PATTERN = re.compile(r'^/v2/country/([^/]+)/indicator/([^/]+)/?$')
+
+
+def fixture_value(indicator: str, country_code: str, year: int) -> float:
+    """Deterministic value so tests can assert on what they fetched"""
+    seed = zlib.crc32(f"{indicator}:{country_code}:{year}".encode())
+    return round((seed % 20000) / 1000 - 5, 3)
+
+
+class StubState:
+    """Counters and knobs shared by every handler thread"""
+
+    def __init__(self, latency_ms: float = 0.0, country_names: Optional[Dict[str, str]] = None,
+                 fail_rate: float = 0.0, fail_status: int = 503, drop: bool = False,
+                 empty_countries: Optional[List[str]] = None, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.country_names = country_names or {}
+        # Fault injection: fail this share of requests with `fail_status`, or
+        # close the connection without answering when `drop` is set
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.drop = drop
+        # Countries the stub has no observations for
+        self.empty_countries = set(empty_countries or [])
+        self.requests = 0
+        self.failures = 0
+        self.active = 0
+        self.max_active = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            failed = self.fail_rate > 0 and self._random.random() < self.fail_rate
+            self.failures += failed
+            return failed
+
+    def enter(self):
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def leave(self):
+        with self._lock:
+            self.active -= 1
+
+
+def build_page(state: StubState, codes: List[str], indicator: str, query: Dict) -> List:
+    start, _, end = query.get('date', ['2010:2024'])[0].partition(':')
+    years = range(int(start), int(end or start) + 1)
+    per_page = int(query.get('per_page', ['50'])[0])
+    page = int(query.get('page', ['1'])[0])
+
+    rows = [(code, year) for code in codes if code not in state.empty_countries
+            for year in sorted(years, reverse=True)]
+    pages = max((len(rows) + per_page - 1) // per_page, 1)
+    chunk = rows[(page - 1) * per_page:page * per_page]
+    return [
+        {'page': page, 'pages': pages, 'per_page': per_page, 'total': len(rows)},
+        [{
+            'indicator': {'id': indicator, 'value': indicator},
+            'country': {'id': code[:2], 'value': state.country_names.get(code, code)},
+            'countryiso3code': code,
+            'date': str(year),
+            'value': fixture_value(indicator, code, year),
+            'unit': '',
+            'obs_status': '',
+            'decimal': 1,
+        } for code, year in chunk],
+    ]
+
+
+def make_handler(state: StubState):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+        def do_GET(self):
+            state.enter()
+            try:
+                if state.latency_ms:
+                    time.sleep(state.latency_ms / 1000)
+                if state.should_fail():
+                    if state.drop:
+                        self.close_connection = True
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                    else:
+                        self._send(state.fail_status, {'message': 'injected failure'})
+                    return
+                url = urlparse(self.path)
+                match = PATH_PATTERN.match(url.path)
+                if not match:
+                    self._send(404, {'message': 'not found'})
+                    return
+                codes = [c.upper() for c in match.group(1).split(';') if c]
+                self._send(200, build_page(state, codes, match.group(2), parse_qs(url.query)))
+            finally:
+                state.leave()
+
+        def _send(self, status: int, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub(port: int = 0, latency_ms: float = 0.0,
+               country_names: Optional[Dict[str, str]] = None,
+               **faults) -> Tuple[ThreadingHTTPServer, str, StubState]:
+    """Serve the stub from a background thread; returns (server, base_url, state)
+
+    Extra keyword arguments configure fault injection (see StubState).
+    """
+    state = StubState(latency_ms, country_names, **faults)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='worldbank-stub', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v2", state
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local World Bank API stub")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.0, help='added latency per request (ms)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='share of requests to fail (0-1)')
+    parser.add_argument('--fail-status', type=int, default=503, help='HTTP status for failed requests')
+    parser.add_argument('--drop', action='store_true', help='drop the connection instead of answering')
+    parser.add_argument('--empty', default='', help='comma-separated countries with no data')
+    args = parser.parse_args()
+
+    state = StubState(args.latency, fail_rate=args.fail_rate, fail_status=args.fail_status,
+                      drop=args.drop, empty_countries=[c for c in args.empty.upper().split(',') if c])
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), make_handler(state))
+    print(f"World Bank stub on http://localhost:{args.port}/v2 (latency {args.latency} ms, "
+          f"fail rate {args.fail_rate})")
+    server.serve_forever()
@@ -6,10 +6,11 @@ Creates comprehensive comparison datasets for India vs other major economies
 import sys
 sys.path.append('.')
 from backend.country_comparison import CountryComparison
-import pandas as pd
+from backend.export_pipeline import ExportPipeline
+import argparse
 import os
 
-def main():
+def main(force: bool = False):
     print("=" * 60)
     print("GENERATING COUNTRY COMPARISON DATA")
     print("=" * 60)
@@ -66,88 +67,32 @@ def main():
     
     all_countries = list(comparator.COMPARISON_COUNTRIES.keys())
     
-    # Generate data for each indicator
-    for config in indicators_config:
-        print(f"📊 Generating {config['display_name']}...")
-        
-        try:
-            # Generate the comparison data
-            df = comparator._generate_synthetic_comparison_data(
-                config['name'], 
-                all_countries
-            )
-            
-            if not df.empty:
-                # Save to CSV
-                output_file = os.path.join(comparison_dir, f"{config['name']}_comparison.csv")
-                df.to_csv(output_file, index=False)
-                print(f"   ✅ Saved {len(df)} records to {output_file}")
-                
-                # Print summary statistics
-                india_data = df[df['country_code'] == 'IND']
-                if not india_data.empty:
-                    latest_india = india_data[india_data['year'] == india_data['year'].max()]['value'].values[0]
-                    print(f"   🇮🇳 India latest value: {latest_india:.2f} {config['unit']}")
-            else:
-                print(f"   ⚠️  No data generated")
-                
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
+    # Indicators run in parallel; unchanged ones are skipped (see export_manifest.json).
+    # The rows are synthetic; India's summary comes from the World Bank comparison data (wb_code)
+    pipeline = ExportPipeline(
+        comparator,
+        comparison_dir,
+        [dict(config, source='synthetic') for config in indicators_config],
+        countries=all_countries,
+        combined_file='all_indicators_comparison.csv',
+        summary_file='india_summary.csv',
+    )
+    report = pipeline.run(force=force)
     
-    # Generate a combined comparison file
-    print(f"\n📋 Generating combined comparison file...")
-    try:
-        combined_data = []
-        
-        for config in indicators_config:
-            df = comparator._generate_synthetic_comparison_data(
-                config['name'], 
-                all_countries
-            )
-            df['indicator_name'] = config['display_name']
-            df['unit'] = config['unit']
-            combined_data.append(df)
-        
-        if combined_data:
-            combined_df = pd.concat(combined_data, ignore_index=True)
-            combined_file = os.path.join(comparison_dir, 'all_indicators_comparison.csv')
-            combined_df.to_csv(combined_file, index=False)
-            print(f"   ✅ Saved {len(combined_df)} records to {combined_file}")
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
+    icons = {'written': '✅', 'unchanged': '⏭️ ', 'empty': '⚠️ ', 'error': '❌'}
+    for config in indicators_config:
+        status = report['indicators'][config['name']]
+        print(f"📊 {config['display_name']}: {icons.get(status, '')} {status}")
+    print(f"\n⏱️  Export took {report['seconds']:.2f}s "
+          f"({len(report['changed'])} of {len(indicators_config)} indicators changed)")
     
-    # Generate India-specific comparison summary
-    print(f"\n🇮🇳 Generating India comparison summary...")
-    try:
-        india_summary = []
-        
-        for config in indicators_config:
-            data = comparator.get_comparison_data(config['wb_code'], all_countries)
-            
-            if 'IND' in data['countries']:
-                india_info = data['countries']['IND']
-                india_summary.append({
-                    'indicator': config['display_name'],
-                    'unit': config['unit'],
-                    'latest_value': india_info['latest'],
-                    'change': india_info['change'],
-                    'average': india_info['average'],
-                    'position': data.get('india_position', 'N/A')
-                })
-        
-        if india_summary:
-            summary_df = pd.DataFrame(india_summary)
-            summary_file = os.path.join(comparison_dir, 'india_summary.csv')
-            summary_df.to_csv(summary_file, index=False)
-            print(f"   ✅ Saved India summary to {summary_file}")
-            
-            # Print summary table
-            print("\n" + "=" * 80)
-            print("INDIA PERFORMANCE SUMMARY")
-            print("=" * 80)
-            print(summary_df.to_string(index=False))
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
+    summary_df = report['summary']
+    if summary_df is not None:
+        # Print summary table
+        print("\n" + "=" * 80)
+        print("INDIA PERFORMANCE SUMMARY")
+        print("=" * 80)
+        print(summary_df.to_string(index=False))
     
     print("\n" + "=" * 60)
     print("✅ COMPARISON DATA GENERATION COMPLETE!")
@@ -159,4 +104,6 @@ def main():
     print("\n")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate country comparison CSV files")
+    parser.add_argument('--force', action='store_true', help='rewrite every file even if unchanged')
+    main(parser.parse_args().force)
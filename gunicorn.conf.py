@@ -0,0 +1,36 @@
+"""
+Gunicorn configuration for IndianPulse
+Prefork workers that share datasets loaded once in the master
+
+Usage:
+    gunicorn -c gunicorn.conf.py "api_server:create_app()"
+
+Environment:
+    PORT             port to bind (default 5000)
+    WEB_CONCURRENCY  worker processes (default: CPU count)
+    WEB_THREADS      threads per worker; above 1 switches to threaded workers
+    WEB_TIMEOUT      worker timeout in seconds (default 60)
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+
+# Import the app (and load every dataset) once in the master before forking
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far into the permanent generation so the
+    # collector in each worker doesn't touch (and copy) the shared pages
+    gc.freeze()
+
+
+def when_ready(server):
+    server.log.info(f"Serving with {workers} workers x {threads} threads ({worker_class})")
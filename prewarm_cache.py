@@ -0,0 +1,67 @@
+"""
+Prewarm comparison caches
+Fetches, stores and indexes every indicator x country ahead of the first users
+
+    python prewarm_cache.py                          # warm the data store
+    python prewarm_cache.py --url http://localhost:5000   # also warm a running server
+
+Safe to run from a deploy hook: upstream failures fall back like normal
+requests and only --strict turns them into a non-zero exit code.
+"""
+
+import sys
+sys.path.append('.')
+from backend.country_comparison import CountryComparison
+from backend.prewarm import common_paths, prewarm_comparisons, prewarm_server
+import argparse
+
+def print_progress(done, total, name, result):
+    if result['ok']:
+        print(f"   [{done}/{total}] ✅ {name} ({result['ms']:.0f} ms)")
+    else:
+        print(f"   [{done}/{total}] ❌ {name}: {result['error']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Prewarm comparison data caches")
+    parser.add_argument('--indicators', help='comma-separated indicator names (default: all)')
+    parser.add_argument('--countries', help='comma-separated country codes (default: all)')
+    parser.add_argument('--workers', type=int, default=4, help='parallel tasks')
+    parser.add_argument('--timeout', type=float, default=300, help='give up after this many seconds')
+    parser.add_argument('--url', help='also request common API paths from a running server')
+    parser.add_argument('--strict', action='store_true', help='exit non-zero if anything failed')
+    args = parser.parse_args()
+    
+    indicators = args.indicators.split(',') if args.indicators else None
+    countries = args.countries.upper().split(',') if args.countries else None
+    
+    print("=" * 60)
+    print("PREWARMING COMPARISON CACHES")
+    print("=" * 60)
+    
+    comparator = CountryComparison()
+    unknown = [name for name in indicators or [] if name not in comparator.WB_INDICATORS]
+    if unknown:
+        parser.error(f"unknown indicators: {', '.join(unknown)}")
+    print(f"\n🔥 Data, panels and rankings ({args.workers} workers)...")
+    report = prewarm_comparisons(comparator, indicators, countries, args.workers,
+                                 args.timeout, print_progress)
+    failed = list(report['failed'])
+    print(f"   ⏱️  {report['seconds']:.2f}s")
+    
+    if args.url:
+        paths = common_paths(comparator, indicators)
+        print(f"\n🌐 {len(paths)} API paths on {args.url}...")
+        server = prewarm_server(args.url, paths, args.workers, args.timeout, progress=print_progress)
+        failed += server['failed']
+        print(f"   ⏱️  {server['seconds']:.2f}s")
+    
+    print("\n" + "=" * 60)
+    if failed:
+        print(f"⚠️  PREWARM FINISHED WITH {len(failed)} FAILURES: {', '.join(failed)}")
+    else:
+        print("✅ PREWARM COMPLETE!")
+    print("=" * 60)
+    return 1 if failed and args.strict else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
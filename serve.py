@@ -0,0 +1,56 @@
+"""
+Production entry point for IndianPulse
+Runs the API (or web) app with prefork Gunicorn workers or threaded Waitress
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+APP_TARGETS = {
+    'api': 'api_server:create_app()',
+    'web': 'app:create_app()',
+}
+
+
+def serve_gunicorn(target: str, workers: int, threads: int, port: int):
+    """Replace this process with a Gunicorn master using gunicorn.conf.py"""
+    os.environ['WEB_CONCURRENCY'] = str(workers)
+    os.environ['WEB_THREADS'] = str(threads)
+    os.environ['PORT'] = str(port)
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    os.execvp(sys.executable, [sys.executable, '-m', 'gunicorn', '-c', config, target])
+
+
+def serve_waitress(target: str, threads: int, port: int):
+    """Single process, thread pool; works on Windows where Gunicorn doesn't"""
+    from waitress import serve
+
+    module_name, factory = target.split(':')
+    module = __import__(module_name)
+    app = getattr(module, factory.rstrip('()'))()
+    print(f"🌐 Waitress serving {target} on http://localhost:{port} with {threads} threads")
+    serve(app, host='0.0.0.0', port=port, threads=threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run IndianPulse in production mode")
+    parser.add_argument('--app', choices=APP_TARGETS.keys(), default='api')
+    parser.add_argument('--server', choices=['gunicorn', 'waitress'],
+                        default='waitress' if os.name == 'nt' else 'gunicorn')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--threads', type=int, default=1,
+                        help='threads per worker (Gunicorn gthread) or pool size (Waitress)')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    args = parser.parse_args()
+
+    target = APP_TARGETS[args.app]
+    if args.server == 'gunicorn':
+        serve_gunicorn(target, args.workers, args.threads, args.port)
+    else:
+        serve_waitress(target, max(args.threads, 4), args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Shared fixtures: a local World Bank stub per test
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.worldbank_stub import start_stub  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    """Start a stub with the given options; yields a factory returning (base_url, state)"""
+    servers = []
+
+    def start(**options):
+        server, base_url, state = start_stub(**options)
+        servers.append(server)
+        return base_url, state
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
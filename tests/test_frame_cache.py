@@ -0,0 +1,25 @@
+import pandas as pd
+
+from backend.frame_cache import FrameLRU
+
+
+def frame():
+    return pd.DataFrame({'year': [2020, 2021], 'value': [1.0, 2.0]})
+
+
+def test_fallback_lookup_counts_once():
+    cache = FrameLRU()
+    assert cache.get_any([('gdp', 'IND'), ('gdp', 'IND', 2000, 2010)], 'v1') is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    cache.put(('gdp', 'IND', 2000, 2010), frame(), 'v1')
+    assert cache.get_any([('gdp', 'IND'), ('gdp', 'IND', 2000, 2010)], 'v1') is not None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_signature_is_a_miss_and_drops_the_entry():
+    cache = FrameLRU()
+    cache.put(('gdp', 'IND'), frame(), 'v1')
+    assert cache.get(('gdp', 'IND'), 'v2') is None
+    assert (cache.hits, cache.misses, cache.invalidations) == (0, 1, 1)
+    assert len(cache) == 0
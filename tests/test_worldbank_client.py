@@ -0,0 +1,74 @@
+"""
+Batching, pagination, concurrency and request coalescing of the World Bank client
+"""
+
+import threading
+import time
+
+from backend.singleflight import SingleFlight
+from backend.worldbank import WorldBankClient
+from backend.worldbank_stub import fixture_value
+
+INDICATOR = 'NY.GDP.MKTP.KD.ZG'
+COUNTRIES = ['IND', 'CHN', 'USA', 'GBR', 'JPN', 'DEU', 'BRA']
+
+
+def test_countries_are_batched(stub):
+    base_url, state = stub()
+    client = WorldBankClient(base_url, batch_size=3)
+
+    df = client.fetch_indicator(INDICATOR, COUNTRIES, 2010, 2012)
+    # ceil(7 / 3) calls, each answering in one page
+    assert state.requests == 3
+    assert sorted(df['country_code'].unique()) == sorted(COUNTRIES)
+    assert len(df) == len(COUNTRIES) * 3
+
+
+def test_every_page_is_followed(stub):
+    base_url, state = stub()
+    client = WorldBankClient(base_url, batch_size=len(COUNTRIES), per_page=4)
+
+    df = client.fetch_indicator(INDICATOR, COUNTRIES, 2010, 2014)
+    # 35 rows at 4 a page
+    assert state.requests == 9
+    assert len(df) == len(COUNTRIES) * 5
+    row = df[(df['country_code'] == 'JPN') & (df['year'] == 2013)].iloc[0]
+    assert row['value'] == fixture_value(INDICATOR, 'JPN', 2013)
+
+
+def test_batches_are_fetched_concurrently(stub):
+    base_url, state = stub(latency_ms=200)
+    client = WorldBankClient(base_url, batch_size=1, max_workers=len(COUNTRIES))
+
+    started = time.monotonic()
+    df = client.fetch_indicator(INDICATOR, COUNTRIES, 2010, 2012)
+    elapsed = time.monotonic() - started
+
+    assert sorted(df['country_code'].unique()) == sorted(COUNTRIES)
+    assert state.max_active > 1
+    # Far less than one round trip per country in turn
+    assert elapsed < 0.2 * len(COUNTRIES) / 2
+
+
+def test_concurrent_identical_fetches_share_one_request(stub):
+    base_url, state = stub(latency_ms=200)
+    client = WorldBankClient(base_url)
+    flight = SingleFlight('worldbank.fetch')
+    callers = 8
+    barrier = threading.Barrier(callers)
+    results = [None] * callers
+
+    def fetch(i):
+        barrier.wait()
+        results[i] = flight.do((INDICATOR, tuple(COUNTRIES)), client.fetch_indicator,
+                               INDICATOR, COUNTRIES, 2010, 2012)
+
+    threads = [threading.Thread(target=fetch, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state.requests == 1
+    assert (flight.executions, flight.coalesced) == (1, callers - 1)
+    assert all(result is results[0] for result in results)
@@ -0,0 +1,68 @@
+"""
+Circuit breaker and negative cache of the World Bank client, under injected faults
+"""
+
+import time
+
+from backend.worldbank import WorldBankClient
+
+INDICATOR = 'NY.GDP.MKTP.KD.ZG'
+
+
+def test_empty_countries_are_negative_cached(stub):
+    base_url, state = stub(empty_countries=['XXX'])
+    client = WorldBankClient(base_url, batch_size=1, negative_ttl=300)
+
+    df = client.fetch_indicator(INDICATOR, ['IND', 'XXX'], 2010, 2012)
+    assert sorted(df['country_code'].unique()) == ['IND']
+    assert client.negative.filter(INDICATOR, ['IND', 'XXX']) == ['IND']
+
+    requests_before = state.requests
+    assert client.fetch_indicator(INDICATOR, ['XXX'], 2010, 2012).empty
+    assert state.requests == requests_before
+
+
+def test_failed_batches_are_not_negative_cached(stub):
+    base_url, state = stub(fail_rate=1.0, fail_status=503)
+    client = WorldBankClient(base_url, batch_size=2, negative_ttl=300, failure_threshold=100)
+
+    assert client.fetch_indicator(INDICATOR, ['IND', 'CHN', 'USA'], 2010, 2012).empty
+    assert len(client.negative) == 0
+
+    # Once the upstream recovers, the same countries are fetched right away
+    state.fail_rate = 0.0
+    df = client.fetch_indicator(INDICATOR, ['IND', 'CHN', 'USA'], 2010, 2012)
+    assert sorted(df['country_code'].unique()) == ['CHN', 'IND', 'USA']
+
+
+def test_dropped_connections_are_not_negative_cached(stub):
+    base_url, state = stub(fail_rate=1.0, drop=True)
+    client = WorldBankClient(base_url, batch_size=1, negative_ttl=300, failure_threshold=100)
+
+    assert client.fetch_indicator(INDICATOR, ['IND', 'CHN'], 2010, 2012).empty
+    assert len(client.negative) == 0
+
+
+def test_circuit_opens_fails_fast_and_recovers(stub):
+    base_url, state = stub(fail_rate=1.0, fail_status=503)
+    client = WorldBankClient(base_url, batch_size=1, max_workers=1, failure_threshold=2,
+                             reset_timeout=0.3, negative_ttl=300)
+    breaker = client.breaker(base_url)
+
+    client.fetch_indicator(INDICATOR, ['IND', 'CHN', 'USA', 'GBR'], 2010, 2012)
+    assert breaker.state == 'open'
+    # Calls after the threshold are refused without reaching the host
+    assert state.requests == 2
+
+    started = time.monotonic()
+    assert client.fetch_indicator(INDICATOR, ['IND'], 2010, 2012).empty
+    assert time.monotonic() - started < 0.1
+    assert state.requests == 2
+    assert len(client.negative) == 0
+
+    # After the reset timeout one probe goes through and closes the circuit
+    state.fail_rate = 0.0
+    time.sleep(0.35)
+    df = client.fetch_indicator(INDICATOR, ['IND'], 2010, 2012)
+    assert list(df['country_code'].unique()) == ['IND']
+    assert breaker.state == 'closed'